@@ -1,11 +1,31 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from itertools import islice
+
 import pandas as pd
 
+try:
+    from python_calamine import CalamineWorkbook
+    HAS_CALAMINE = True  # Rust实现的XLSX解析
+except ImportError:
+    from openpyxl import load_workbook
+    HAS_CALAMINE = False
+
 try:
     print("正在加载 Online Retail.xlsx...")
-    df = pd.read_excel('data/Online Retail.xlsx', nrows=10)
+    if HAS_CALAMINE:
+        # calamine 只解析表头和前10行
+        wb = CalamineWorkbook.from_path('data/Online Retail.xlsx')
+        rows = wb.get_sheet_by_index(0).to_python(nrows=11)
+    else:
+        # 只读模式流式解析，只取表头和前10行，不构建完整的工作簿模型
+        wb = load_workbook('data/Online Retail.xlsx', read_only=True, data_only=True)
+        try:
+            rows = list(islice(wb.active.iter_rows(values_only=True), 11))
+        finally:
+            wb.close()
+    df = pd.DataFrame(rows[1:], columns=rows[0])
     
     print("列名:", df.columns.tolist())
     print("\n数据类型:")
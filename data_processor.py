@@ -1,57 +1,102 @@
 import pandas as pd
 import numpy as np
 import os
-from datetime import datetime, timedelta
-import random
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from scripts.data_utils import write_csv
+
+try:
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True  # 多线程CSV解析、Parquet读写
+except ImportError:
+    HAS_PYARROW = False
+
+# 支持的数据文件格式
+DATA_FILE_EXTENSIONS = ('.csv', '.parquet')
+
+# 自动并行生成的记录总数下限：生成并写出100万行约需0.3秒，
+# 数据量更小时每个子进程导入 pandas 的开销超过并行收益
+PARALLEL_MIN_ROWS = 2_000_000
 
 class SalesDataProcessor:
     """销售数据处理器，用于分析现有数据并生成测试数据"""
     
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", seed=None):
         self.data_dir = data_dir
+        self.seed_seq = np.random.SeedSequence(seed)  # 为每个测试数据集派生独立子种子
+        self.rng = np.random.default_rng(self.seed_seq)
         self.required_columns = ['Order_ID', 'Product', 'Quantity', 'Price', 'Order_Date', 'Region']
+        self._df_cache = {}  # 文件路径 -> DataFrame，保证每次运行每个文件最多解析一次
+        
+    def _read(self, filepath):
+        """读取CSV/Parquet文件（带缓存）"""
+        if filepath not in self._df_cache:
+            if filepath.endswith('.parquet'):
+                self._df_cache[filepath] = pd.read_parquet(filepath)
+            else:
+                engine = 'pyarrow' if HAS_PYARROW else 'c'
+                self._df_cache[filepath] = pd.read_csv(filepath, engine=engine, dtype={'Order_Date': str})
+        return self._df_cache[filepath]
+        
+    def _iter_data_files(self):
+        """遍历数据目录中的CSV/Parquet文件，返回 (文件名, 路径)"""
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(DATA_FILE_EXTENSIONS) and entry.is_file():
+                    yield entry.name, entry.path
         
     def analyze_existing_data(self):
         """分析现有数据文件，检查是否符合要求"""
         print("=== 分析现有数据文件 ===")
         
-        for filename in os.listdir(self.data_dir):
-            if filename.endswith('.csv'):
-                filepath = os.path.join(self.data_dir, filename)
-                print(f"\n分析文件: {filename}")
+        for filename, filepath in self._iter_data_files():
+            print(f"\n分析文件: {filename}")
+            
+            try:
+                # 读取完整文件（仅解析一次，结果缓存供后续步骤复用）
+                df_full = self._read(filepath)
+                print(f"文件列: {list(df_full.columns)}")
                 
-                try:
-                    # 读取文件前几行来检查结构
-                    df = pd.read_csv(filepath, nrows=5)
-                    print(f"文件列: {list(df.columns)}")
-                    print(f"文件形状: {df.shape}")
+                # 检查是否包含所有必需列
+                missing_cols = [col for col in self.required_columns if col not in df_full.columns]
+                if missing_cols:
+                    print(f"❌ 缺少必需列: {missing_cols}")
+                    return False
+                else:
+                    print("✅ 包含所有必需列")
                     
-                    # 检查是否包含所有必需列
-                    missing_cols = [col for col in self.required_columns if col not in df.columns]
-                    if missing_cols:
-                        print(f"❌ 缺少必需列: {missing_cols}")
-                        return False
-                    else:
-                        print("✅ 包含所有必需列")
-                        
-                    # 检查完整文件
-                    df_full = pd.read_csv(filepath)
-                    print(f"完整文件形状: {df_full.shape}")
-                    print(f"缺失值统计:")
-                    for col in self.required_columns:
-                        missing_count = df_full[col].isnull().sum()
-                        missing_percent = (missing_count / len(df_full)) * 100
-                        print(f"  {col}: {missing_count} ({missing_percent:.1f}%)")
-                        
-                except Exception as e:
-                    print(f"❌ 读取文件失败: {e}")
+                # 检查完整文件
+                print(f"完整文件形状: {df_full.shape}")
+                print(f"缺失值统计:")
+                # 一次性统计所有必需列的缺失值
+                missing_counts = df_full[self.required_columns].isna().sum()
+                missing_percents = missing_counts * (100.0 / max(len(df_full), 1))
+                print("\n".join(f"  {col}: {missing_counts[col]} ({missing_percents[col]:.1f}%)"
+                                for col in self.required_columns))
                     
+            except Exception as e:
+                print(f"❌ 读取文件失败: {e}")
+                
         return True
     
-    def generate_test_data(self):
-        """生成多种不同方向的测试数据文件"""
+    def generate_test_data(self, file_format='parquet', max_workers=None):
+        """生成多种不同方向的测试数据文件
+        
+        file_format: 'parquet'（默认，Snappy压缩的列式存储）或 'csv'
+        max_workers: 并行生成的进程数，默认按CPU核数；为1时在当前进程内顺序生成。
+            未指定且记录总数不足 PARALLEL_MIN_ROWS 时同样顺序生成；进程池不可用时
+            剩余的数据集改为顺序生成
+        """
         print("\n=== 生成测试数据文件 ===")
         
+        if file_format == 'parquet' and not HAS_PYARROW:
+            print("警告: 未安装 pyarrow，改为保存CSV文件")
+            file_format = 'csv'
+        
         # 产品列表
         products = [
             # 电子产品
@@ -84,91 +129,104 @@ class SalesDataProcessor:
             'product_category_dataset': 2500,  # 产品类别数据集
         }
         
-        for dataset_name, size in test_datasets.items():
+        # 每个数据集使用独立的子种子：结果可复现，且与是否并行、执行顺序无关
+        child_seeds = self.seed_seq.spawn(len(test_datasets))
+        tasks = [
+            (dataset_name, size, products, regions, child_seed,
+             os.path.join(self.data_dir, f"{dataset_name}.{file_format}"), file_format)
+            for (dataset_name, size), child_seed in zip(test_datasets.items(), child_seeds)
+        ]
+        
+        workers = min(len(tasks), max_workers or os.cpu_count() or 1)
+        if max_workers is None and sum(test_datasets.values()) < PARALLEL_MIN_ROWS:
+            workers = 1
+        
+        done = set()
+        if workers > 1:
+            # 各数据集相互独立，在子进程中生成并直接写文件，主进程不持有大DataFrame
+            print(f"使用 {workers} 个进程并行生成")
+            for dataset_name, size in test_datasets.items():
+                print(f"生成 {dataset_name} ({size} 条记录)...")
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    for task, filename in zip(tasks, executor.map(_generate_and_write, tasks)):
+                        done.add(task[0])
+                        print(f"  保存到: {filename}")
+            except (OSError, BrokenProcessPool) as e:
+                print(f"警告: 进程池不可用，改为顺序生成剩余的数据集: {e}")
+        
+        # 顺序生成（数据量小、max_workers=1 或进程池失败后剩余的数据集）
+        for task in tasks:
+            dataset_name, size, _, _, child_seed, filepath, _ = task
+            if dataset_name in done:
+                continue
             print(f"生成 {dataset_name} ({size} 条记录)...")
-            df = self._generate_dataset(dataset_name, size, products, regions)
-            filename = f"{dataset_name}.csv"
-            filepath = os.path.join(self.data_dir, filename)
-            df.to_csv(filepath, index=False)
-            print(f"  保存到: {filename}")
-            
-    def _generate_dataset(self, dataset_type, size, products, regions):
+            df = self._generate_dataset(dataset_name, size, products, regions,
+                                        rng=np.random.default_rng(child_seed))
+            _write_dataset(df, filepath, file_format)
+            self._df_cache[filepath] = df
+            print(f"  保存到: {os.path.basename(filepath)}")
+    
+    def _generate_dataset(self, dataset_type, size, products, regions, rng=None):
         """生成特定类型的数据集"""
+        rng = self.rng if rng is None else rng
         
-        # 基础数据框架
-        data = {
-            'Order_ID': range(1, size + 1),
-            'Product': [random.choice(products) for _ in range(size)],
-            'Quantity': [random.randint(1, 50) for _ in range(size)],
-            'Price': [round(random.uniform(10, 1000), 2) for _ in range(size)],
-            'Order_Date': [],
-            'Region': [random.choice(regions) for _ in range(size)]
-        }
+        # 基础数据框架 - 每列一次性批量采样
+        # Product/Region 直接以类别编码生成，最终构建为 Categorical（-1 表示缺失）
+        product_codes = rng.integers(0, len(products), size)
+        region_codes = rng.integers(0, len(regions), size)
+        price = np.round(rng.uniform(10, 1000, size), 2)
+        
+        # 根据数据集类型调整特征（在构建DataFrame之前完成，避免逐行赋值）
+        if dataset_type == 'regional_focus_dataset':
+            # 地区重点数据集 - 主要集中在某些地区
+            focus_regions = [regions.index(r) for r in ['North', 'South']]
+            focus_mask = rng.random(size) < 0.8  # 80%的数据集中在重点地区
+            region_codes[focus_mask] = rng.choice(focus_regions, focus_mask.sum())
+            
+        elif dataset_type == 'product_category_dataset':
+            # 产品类别数据集 - 主要是电子产品
+            electronics = [products.index(p) for p in
+                           ['Laptop', 'Desktop', 'Tablet', 'Smartphone', 'Monitor', 'Keyboard', 'Mouse']]
+            electronics_mask = rng.random(size) < 0.7  # 70%是电子产品
+            product_codes[electronics_mask] = rng.choice(electronics, electronics_mask.sum())
         
-        # 生成日期
+        # 缺失值比例: high_missing_dataset 为 Price 30% / Region 20%，其余为 10% / 5%
+        if dataset_type == 'high_missing_dataset':
+            price_missing_rate, region_missing_rate = 0.3, 0.2
+        else:
+            price_missing_rate, region_missing_rate = 0.1, 0.05
+        
+        # 伯努利掩码注入缺失值（逐行独立，无需构造精确数量的索引集合）
+        price[rng.random(size) < price_missing_rate] = np.nan
+        region_codes[rng.random(size) < region_missing_rate] = -1
+        
+        # 生成日期（以按天精度的 datetime64 数组生成，不转换为字符串）
         if dataset_type == 'seasonal_dataset':
             # 季节性数据 - 主要集中在特定月份
             seasonal_months = [11, 12, 1, 2]  # 主要在年末年初
-            for _ in range(size):
-                if random.random() < 0.7:  # 70%的数据在季节性月份
-                    month = random.choice(seasonal_months)
-                    year = random.choice([2022, 2023, 2024])
-                    day = random.randint(1, 28)
-                else:
-                    month = random.randint(1, 12)
-                    year = random.choice([2022, 2023, 2024])
-                    day = random.randint(1, 28)
-                
-                date = datetime(year, month, day)
-                data['Order_Date'].append(date.strftime('%Y-%m-%d'))
+            in_season = rng.random(size) < 0.7  # 70%的数据在季节性月份
+            months = np.where(in_season, rng.choice(seasonal_months, size), rng.integers(1, 13, size))
+            years = rng.choice([2022, 2023, 2024], size)
+            days = rng.integers(1, 29, size)
+            # 直接用 datetime64 的月/日偏移组合日期，无需逐个解析
+            month_start = ((years - 1970) * 12 + (months - 1)).astype('datetime64[M]')
+            order_date = month_start.astype('datetime64[D]') + (days - 1)
         else:
             # 常规日期分布
-            start_date = datetime(2022, 1, 1)
-            end_date = datetime(2024, 12, 31)
-            for _ in range(size):
-                random_date = start_date + timedelta(
-                    days=random.randint(0, (end_date - start_date).days)
-                )
-                data['Order_Date'].append(random_date.strftime('%Y-%m-%d'))
-        
-        df = pd.DataFrame(data)
-        
-        # 根据数据集类型调整特征
-        if dataset_type == 'high_missing_dataset':
-            # 高缺失值数据集
-            # Price列30%缺失
-            missing_price_indices = random.sample(range(size), int(size * 0.3))
-            df.loc[missing_price_indices, 'Price'] = np.nan
-            
-            # Region列20%缺失
-            missing_region_indices = random.sample(range(size), int(size * 0.2))
-            df.loc[missing_region_indices, 'Region'] = np.nan
-            
-        elif dataset_type == 'regional_focus_dataset':
-            # 地区重点数据集 - 主要集中在某些地区
-            focus_regions = ['North', 'South']
-            for i in range(size):
-                if random.random() < 0.8:  # 80%的数据集中在重点地区
-                    df.loc[i, 'Region'] = random.choice(focus_regions)
-                    
-        elif dataset_type == 'product_category_dataset':
-            # 产品类别数据集 - 主要是电子产品
-            electronics = ['Laptop', 'Desktop', 'Tablet', 'Smartphone', 'Monitor', 'Keyboard', 'Mouse']
-            for i in range(size):
-                if random.random() < 0.7:  # 70%是电子产品
-                    df.loc[i, 'Product'] = random.choice(electronics)
-                    
-        # 添加一些随机缺失值（除了high_missing_dataset）
-        if dataset_type != 'high_missing_dataset':
-            # Price列10%缺失
-            missing_price_indices = random.sample(range(size), int(size * 0.1))
-            df.loc[missing_price_indices, 'Price'] = np.nan
-            
-            # Region列5%缺失
-            missing_region_indices = random.sample(range(size), int(size * 0.05))
-            df.loc[missing_region_indices, 'Region'] = np.nan
+            start_date = np.datetime64('2022-01-01')
+            end_date = np.datetime64('2024-12-31')
+            offsets = rng.integers(0, (end_date - start_date).astype(int) + 1, size)
+            order_date = start_date + offsets
         
-        return df
+        return pd.DataFrame({
+            'Order_ID': np.arange(1, size + 1, dtype=np.int32),
+            'Product': pd.Categorical.from_codes(product_codes, categories=products),
+            'Quantity': rng.integers(1, 51, size, dtype=np.int16),
+            'Price': price,
+            'Order_Date': order_date,
+            'Region': pd.Categorical.from_codes(region_codes, categories=regions)
+        })
     
     def clean_data_directory(self):
         """清理数据目录，移除不符合要求的文件"""
@@ -177,36 +235,132 @@ class SalesDataProcessor:
         valid_files = []
         invalid_files = []
         
-        for filename in os.listdir(self.data_dir):
-            if filename.endswith('.csv'):
-                filepath = os.path.join(self.data_dir, filename)
+        for filename, filepath in self._iter_data_files():
+            
+            try:
+                # 只需列名：优先使用缓存，Parquet直接读取文件元数据中的schema
+                if filepath in self._df_cache:
+                    columns = self._df_cache[filepath].columns
+                elif filepath.endswith('.parquet'):
+                    columns = pq.read_schema(filepath).names
+                else:
+                    columns = pd.read_csv(filepath, nrows=5).columns
+                missing_cols = [col for col in self.required_columns if col not in columns]
                 
-                try:
-                    df = pd.read_csv(filepath, nrows=5)
-                    missing_cols = [col for col in self.required_columns if col not in df.columns]
-                    
-                    if missing_cols:
-                        invalid_files.append(filename)
-                        print(f"❌ 将删除: {filename} (缺少列: {missing_cols})")
-                    else:
-                        valid_files.append(filename)
-                        print(f"✅ 保留: {filename}")
-                        
-                except Exception as e:
+                if missing_cols:
                     invalid_files.append(filename)
-                    print(f"❌ 将删除: {filename} (读取错误: {e})")
+                    print(f"❌ 将删除: {filename} (缺少列: {missing_cols})")
+                else:
+                    valid_files.append(filename)
+                    print(f"✅ 保留: {filename}")
+                    
+            except Exception as e:
+                invalid_files.append(filename)
+                print(f"❌ 将删除: {filename} (读取错误: {e})")
         
         # 删除无效文件
         for filename in invalid_files:
             filepath = os.path.join(self.data_dir, filename)
             try:
                 os.remove(filepath)
+                self._df_cache.pop(filepath, None)
                 print(f"已删除: {filename}")
             except Exception as e:
                 print(f"删除失败 {filename}: {e}")
         
         print(f"\n清理完成! 保留 {len(valid_files)} 个文件，删除 {len(invalid_files)} 个文件")
         
+    def _summarize(self, filepath):
+        """统计单个文件的概况指标
+        
+        已缓存的文件直接用DataFrame计算；否则 Parquet 读取元数据统计，
+        CSV 按数据块流式累计，避免为几个标量把整个文件载入内存
+        """
+        if filepath in self._df_cache or not HAS_PYARROW:
+            df = self._read(filepath)
+            return {
+                'rows': len(df),
+                'columns': len(df.columns),
+                'date_min': df['Order_Date'].min(),
+                'date_max': df['Order_Date'].max(),
+                'products': df['Product'].nunique(),
+                'regions': df['Region'].nunique(),
+                'price_missing': df['Price'].isna().sum(),
+                'region_missing': df['Region'].isna().sum(),
+            }
+        if filepath.endswith('.parquet'):
+            return self._summarize_parquet(filepath)
+        return self._summarize_csv(filepath)
+    
+    def _summarize_parquet(self, filepath):
+        """从 Parquet 元数据（行数、列统计）获取概况，只读取需要去重计数的列"""
+        parquet_file = pq.ParquetFile(filepath)
+        metadata = parquet_file.metadata
+        names = parquet_file.schema_arrow.names
+        
+        def column_stats(name):
+            index = names.index(name)
+            return [metadata.row_group(i).column(index).statistics for i in range(metadata.num_row_groups)]
+        
+        summary = {'rows': metadata.num_rows, 'columns': len(names)}
+        
+        date_stats = column_stats('Order_Date')
+        if all(st is not None and st.has_min_max for st in date_stats):
+            summary['date_min'] = min(st.min for st in date_stats)
+            summary['date_max'] = max(st.max for st in date_stats)
+        else:
+            min_max = pc.min_max(parquet_file.read(columns=['Order_Date']).column(0)).as_py()
+            summary['date_min'], summary['date_max'] = min_max['min'], min_max['max']
+        
+        for name, key in [('Price', 'price_missing'), ('Region', 'region_missing')]:
+            stats = column_stats(name)
+            if all(st is not None and st.has_null_count for st in stats):
+                summary[key] = sum(st.null_count for st in stats)
+            else:
+                summary[key] = parquet_file.read(columns=[name]).column(0).null_count
+        
+        distinct = parquet_file.read(columns=['Product', 'Region'])
+        summary['products'] = len(pc.unique(distinct.column('Product').drop_null()))
+        summary['regions'] = len(pc.unique(distinct.column('Region').drop_null()))
+        return summary
+    
+    def _summarize_csv(self, filepath):
+        """按 1MB 数据块流式读取 CSV 并累计概况指标"""
+        reader = pa_csv.open_csv(
+            filepath,
+            read_options=pa_csv.ReadOptions(block_size=1 << 20),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=['Order_Date', 'Product', 'Region', 'Price'],
+                column_types={'Order_Date': 'string'},
+                strings_can_be_null=True,
+            ),
+        )
+        summary = {'rows': 0, 'price_missing': 0, 'region_missing': 0, 'date_min': None, 'date_max': None}
+        products, regions = set(), set()
+        
+        # include_columns 只决定解析哪些列，列数需从表头获取
+        with open(filepath, 'r', encoding='utf-8-sig') as f:
+            summary['columns'] = len(f.readline().rstrip('\r\n').split(','))
+        
+        for batch in reader:
+            summary['rows'] += batch.num_rows
+            summary['price_missing'] += batch.column('Price').null_count
+            summary['region_missing'] += batch.column('Region').null_count
+            
+            min_max = pc.min_max(batch.column('Order_Date')).as_py()
+            if min_max['min'] is not None:
+                if summary['date_min'] is None or min_max['min'] < summary['date_min']:
+                    summary['date_min'] = min_max['min']
+                if summary['date_max'] is None or min_max['max'] > summary['date_max']:
+                    summary['date_max'] = min_max['max']
+            
+            products.update(pc.unique(batch.column('Product').drop_null()).to_pylist())
+            regions.update(pc.unique(batch.column('Region').drop_null()).to_pylist())
+        
+        summary['products'] = len(products)
+        summary['regions'] = len(regions)
+        return summary
+    
     def generate_summary_report(self):
         """生成数据概况报告"""
         print("\n=== 生成数据概况报告 ===")
@@ -217,31 +371,36 @@ class SalesDataProcessor:
         report.append("")
         
         total_records = 0
-        for filename in os.listdir(self.data_dir):
-            if filename.endswith('.csv'):
-                filepath = os.path.join(self.data_dir, filename)
-                try:
-                    df = pd.read_csv(filepath)
-                    total_records += len(df)
-                    
-                    report.append(f"## {filename}")
-                    report.append(f"- 记录数: {len(df):,}")
-                    report.append(f"- 列数: {len(df.columns)}")
-                    report.append(f"- 日期范围: {df['Order_Date'].min()} 到 {df['Order_Date'].max()}")
-                    report.append(f"- 产品种类: {df['Product'].nunique()}")
-                    report.append(f"- 地区数量: {df['Region'].nunique()}")
-                    report.append(f"- Price缺失率: {(df['Price'].isnull().sum() / len(df) * 100):.1f}%")
-                    report.append(f"- Region缺失率: {(df['Region'].isnull().sum() / len(df) * 100):.1f}%")
-                    report.append("")
-                    
-                except Exception as e:
-                    report.append(f"## {filename}")
-                    report.append(f"- 错误: {e}")
-                    report.append("")
+        file_count = 0
+        for filename, filepath in self._iter_data_files():
+            file_count += 1
+            try:
+                summary = self._summarize(filepath)
+                rows = summary['rows']
+                total_records += rows
+                
+                # 日期可能是字符串(CSV)或时间戳(Parquet)，统一输出为 YYYY-MM-DD
+                date_min, date_max = (d.strftime('%Y-%m-%d') if hasattr(d, 'strftime') else d
+                                      for d in (summary['date_min'], summary['date_max']))
+                
+                report.append(f"## {filename}")
+                report.append(f"- 记录数: {rows:,}")
+                report.append(f"- 列数: {summary['columns']}")
+                report.append(f"- 日期范围: {date_min} 到 {date_max}")
+                report.append(f"- 产品种类: {summary['products']}")
+                report.append(f"- 地区数量: {summary['regions']}")
+                report.append(f"- Price缺失率: {summary['price_missing'] / max(rows, 1) * 100:.1f}%")
+                report.append(f"- Region缺失率: {summary['region_missing'] / max(rows, 1) * 100:.1f}%")
+                report.append("")
+                
+            except Exception as e:
+                report.append(f"## {filename}")
+                report.append(f"- 错误: {e}")
+                report.append("")
         
         report.append(f"## 总计")
         report.append(f"- 总记录数: {total_records:,}")
-        report.append(f"- 数据文件数: {len([f for f in os.listdir(self.data_dir) if f.endswith('.csv')])}")
+        report.append(f"- 数据文件数: {file_count}")
         
         # 保存报告
         report_path = os.path.join(self.data_dir, "data_summary_report.md")
@@ -253,6 +412,28 @@ class SalesDataProcessor:
         # 同时打印到控制台
         print("\n" + '\n'.join(report))
 
+def _write_dataset(df, filepath, file_format):
+    """按指定格式保存测试数据集，并删除之前以另一种格式生成的同名数据集"""
+    if file_format == 'parquet':
+        df.to_parquet(filepath, engine='pyarrow', compression='snappy', index=False)
+    else:
+        # 按批流式写出，不一次性格式化整个数据集（测试数据不带 BOM）
+        write_csv(df, filepath, bom=False)
+    
+    # 旧格式的文件留在数据目录中会被当作另一个数据集重复统计
+    stale_path = os.path.splitext(filepath)[0] + ('.csv' if file_format == 'parquet' else '.parquet')
+    if os.path.exists(stale_path):
+        os.remove(stale_path)
+
+def _generate_and_write(task):
+    """子进程任务：生成单个测试数据集并写入文件，只返回文件名"""
+    dataset_name, size, products, regions, seed_seq, filepath, file_format = task
+    processor = SalesDataProcessor(data_dir=os.path.dirname(filepath))
+    df = processor._generate_dataset(dataset_name, size, products, regions,
+                                     rng=np.random.default_rng(seed_seq))
+    _write_dataset(df, filepath, file_format)
+    return os.path.basename(filepath)
+
 def main():
     """主函数"""
     processor = SalesDataProcessor()
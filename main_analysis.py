@@ -17,12 +17,16 @@
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import sys
 import os
 from datetime import datetime
 
+try:
+    import polars as pl
+    HAS_POLARS = True  # 多线程groupby聚合
+except ImportError:
+    HAS_POLARS = False
+
 # 添加scripts目录到路径
 sys.path.append('scripts')
 
@@ -33,20 +37,38 @@ from scripts.data_utils import (
     clean_data, 
     handle_outliers, 
     exploratory_analysis,
-    save_results
+    save_results,
+    write_csv
 )
 
-def main():
-    """主函数"""
+# 图表样式（替代 plt.style.use('seaborn-v0_8')，只在需要绘图时更新一次 rcParams）
+PLOT_STYLE = {
+    'axes.facecolor': '#EAEAF2',
+    'axes.edgecolor': 'white',
+    'axes.grid': True,
+    'grid.color': 'white',
+    'axes.axisbelow': True,
+    'axes.spines.top': False,
+    'axes.spines.right': False,
+}
+
+# 图表输出分辨率：草稿 / 发布
+DRAFT_DPI = 120
+PUBLISH_DPI = 300
+
+def main(make_plots=False, dpi=DRAFT_DPI):
+    """主函数
+    
+    Args:
+        make_plots: 是否生成PNG图表（默认不生成，与原流程一致）
+        dpi: 图表输出分辨率
+    """
     try:
         print("=" * 50)
         print("    销售数据分析项目 (Sales Data Analysis)")
         print("=" * 50)
         print(f"开始时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
-        # 配置中文字体
-        setup_chinese_fonts()
-        
         # 1. 加载和检查数据
         df = load_and_check_data('data/raw_sales_data.csv')
         if df is None:
@@ -61,14 +83,25 @@ def main():
         # 4. 探索性分析
         df_analyzed, grouped_results = exploratory_analysis(df_processed)
         
+        # 地区/产品表现统计只计算一次，后续步骤共用
+        region_performance, product_performance = compute_performance(df_analyzed)
+        
         # 5. 保存结果
         save_results(df_analyzed, grouped_results, 'outputs')
         
         # 6. 保存分析结果（中英文对照）
-        save_analysis_results(df_analyzed, grouped_results, 'outputs')
+        save_analysis_results(df_analyzed, grouped_results, 'outputs', product_performance)
         
         # 7. 生成报告
-        generate_report(df_analyzed, grouped_results)
+        generate_report(df_analyzed, grouped_results, region_performance, product_performance)
+        
+        # 8. 生成可视化图表（可选）
+        if make_plots:
+            import matplotlib.pyplot as plt
+            setup_chinese_fonts()
+            plt.rcParams.update(PLOT_STYLE)
+            generate_visualizations(df_analyzed, grouped_results, region_performance, product_performance,
+                                    dpi=dpi)
         
         print("\n" + "=" * 50)
         print("✅ 销售数据分析完成！")
@@ -85,12 +118,15 @@ def main():
 
 def setup_chinese_fonts():
     """配置中文字体支持"""
+    # matplotlib 仅在需要绘图时导入，纯报告运行不触发字体缓存扫描
+    import matplotlib.pyplot as plt
+    
     try:
         import matplotlib.font_manager as fm
         
         # 尝试使用系统中的中文字体
         chinese_fonts = ['Microsoft YaHei', 'SimHei', 'SimSun', 'FangSong']
-        available_fonts = [f.name for f in fm.fontManager.ttflist]
+        available_fonts = {f.name for f in fm.fontManager.ttflist}
         
         font_found = False
         for font in chinese_fonts:
@@ -111,35 +147,41 @@ def setup_chinese_fonts():
         plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
         plt.rcParams['axes.unicode_minus'] = False
 
-def generate_visualizations(df, grouped_data):
+def generate_visualizations(df, grouped_data, region_performance=None, product_performance=None,
+                            dpi=DRAFT_DPI):
     """
-    生成可视化图表
+    生成可视化图表（两张图复用同一个Figure）
     """
-    # 设置图表样式
-    plt.style.use('seaborn-v0_8')
+    import matplotlib.pyplot as plt
+    
+    if region_performance is None or product_performance is None:
+        region_performance, product_performance = compute_performance(df)
+    region_sales = grouped_data['总销售额 (Total Sales)']
     
     # 1. 各地区总销售额柱状图
-    plt.figure(figsize=(10, 6))
-    region_sales = grouped_data['总销售额']
-    region_sales.plot(kind='bar', color='skyblue', alpha=0.8, edgecolor='black')
-    plt.title('各地区总销售额', fontsize=16, fontweight='bold')
-    plt.xlabel('地区', fontsize=12)
-    plt.ylabel('总销售额', fontsize=12)
-    plt.xticks(rotation=45)
-    plt.grid(True, alpha=0.3)
+    fig = plt.figure(figsize=(10, 6))
+    ax = fig.add_subplot()
+    region_sales.plot(kind='bar', ax=ax, color='skyblue', alpha=0.8, edgecolor='black')
+    ax.set_title('各地区总销售额', fontsize=16, fontweight='bold')
+    ax.set_xlabel('地区', fontsize=12)
+    ax.set_ylabel('总销售额', fontsize=12)
+    ax.tick_params(axis='x', rotation=45)
+    ax.grid(True, alpha=0.3)
     
     # 添加数值标签
+    label_offset = region_sales.max() * 0.01
     for i, v in enumerate(region_sales):
-        plt.text(i, v + max(region_sales) * 0.01, f'{v:,.0f}', 
-                 ha='center', va='bottom', fontweight='bold')
+        ax.text(i, v + label_offset, f'{v:,.0f}', 
+                ha='center', va='bottom', fontweight='bold')
     
-    plt.tight_layout()
-    plt.savefig('outputs/sales_by_region.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    fig.tight_layout()
+    fig.savefig('outputs/sales_by_region.png', dpi=dpi, bbox_inches='tight')
     print("各地区总销售额柱状图已保存到 outputs/sales_by_region.png")
     
-    # 2. 综合分析图表
-    fig, axes = plt.subplots(2, 2, figsize=(15, 12))
+    # 2. 综合分析图表（清空并复用同一个Figure）
+    fig.clear()
+    fig.set_size_inches(15, 12)
+    axes = fig.subplots(2, 2)
     
     # 各地区销售额分布
     axes[0, 0].bar(region_sales.index, region_sales.values, color='skyblue', alpha=0.8)
@@ -155,7 +197,7 @@ def generate_visualizations(df, grouped_data):
     axes[0, 1].set_ylabel('频次')
     
     # 产品销售额前10
-    product_sales = df.groupby('Product')['Sales'].sum().sort_values(ascending=False).head(10)
+    product_sales = product_performance['总销售额'].head(10)
     axes[1, 0].barh(range(len(product_sales)), product_sales.values, color='lightgreen', alpha=0.8)
     axes[1, 0].set_yticks(range(len(product_sales)))
     axes[1, 0].set_yticklabels(product_sales.index, fontsize=8)
@@ -163,49 +205,95 @@ def generate_visualizations(df, grouped_data):
     axes[1, 0].set_xlabel('总销售额')
     
     # 订单数量vs销售额散点图
-    region_summary = df.groupby('Region').agg({'Sales': 'sum', 'Order_ID': 'count'})
-    axes[1, 1].scatter(region_summary['Order_ID'], region_summary['Sales'], 
+    axes[1, 1].scatter(region_performance['订单数量'], region_performance['总销售额'], 
                        s=100, alpha=0.7, color='orange')
-    for i, region in enumerate(region_summary.index):
-        axes[1, 1].annotate(region, (region_summary['Order_ID'].iloc[i], region_summary['Sales'].iloc[i]),
+    for region, orders, sales in zip(region_performance.index, region_performance['订单数量'],
+                                     region_performance['总销售额']):
+        axes[1, 1].annotate(region, (orders, sales),
                             xytext=(5, 5), textcoords='offset points', fontsize=8)
     axes[1, 1].set_title('订单数量 vs 总销售额', fontsize=14, fontweight='bold')
     axes[1, 1].set_xlabel('订单数量')
     axes[1, 1].set_ylabel('总销售额')
     
-    plt.tight_layout()
-    plt.savefig('outputs/comprehensive_analysis.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    fig.tight_layout()
+    fig.savefig('outputs/comprehensive_analysis.png', dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
     print("综合分析图表已保存到 outputs/comprehensive_analysis.png")
 
-def generate_report(df, grouped_data):
+def _format_currency(table, currency_cols):
+    """将金额列整列格式化为 ¥ 字符串，用于Markdown表格"""
+    table = table.copy()
+    for col in currency_cols:
+        table[col] = '¥' + table[col].map('{:,.2f}'.format)
+    return table
+
+def _aggregate_performance(df, key, aggs):
+    """
+    按 key 分组聚合，aggs 为 {输出列: (源列, 聚合函数)}；
+    安装了 Polars 时使用其多线程 group_by，结果转回 pandas。
+    两种实现结果一致：key 缺失的行不参与分组，组按首次出现的顺序排列，
+    按总销售额稳定排序（销售额相同时保持首次出现的顺序）
+    """
+    if HAS_POLARS:
+        pl_aggs = [getattr(pl.col(src), func)().alias(name) for name, (src, func) in aggs.items()]
+        stats = (pl.from_pandas(df[[key] + sorted({src for src, _ in aggs.values()})])
+                 .filter(pl.col(key).is_not_null())
+                 .group_by(key, maintain_order=True)
+                 .agg(pl_aggs)
+                 .to_pandas()
+                 .set_index(key))
+        # Polars 的 count 为 uint32，与 pandas 保持一致
+        stats = stats.astype({name: 'int64' for name, (_, func) in aggs.items() if func == 'count'})
+    else:
+        stats = df.groupby(key, observed=True, sort=False).agg(**aggs)
+    return stats.round(2).sort_values('总销售额', ascending=False, kind='stable')
+
+def compute_performance(df):
+    """
+    一次性计算地区/产品表现统计（每个维度只做一次groupby），供报告、保存和图表共用
+    """
+    # 地区表现分析
+    region_performance = _aggregate_performance(df, 'Region', {
+        '总销售额': ('Sales', 'sum'),
+        '平均订单金额': ('Sales', 'mean'),
+        '订单数量': ('Sales', 'count'),
+        '平均数量': ('Quantity', 'mean'),
+        '平均价格': ('Price', 'mean'),
+    })
+    
+    # 产品表现分析
+    product_performance = _aggregate_performance(df, 'Product', {
+        '总销售额': ('Sales', 'sum'),
+        '平均订单金额': ('Sales', 'mean'),
+        '销售次数': ('Sales', 'count'),
+        '总销量': ('Quantity', 'sum'),
+        '平均价格': ('Price', 'mean'),
+    })
+    
+    return region_performance, product_performance
+
+def generate_report(df, grouped_data, region_performance=None, product_performance=None):
     """
     生成分析报告
     """
-    # 计算关键指标
-    total_sales = df['Sales'].sum()
-    avg_order_value = df['Sales'].mean()
+    # 计算关键指标（三列的求和/均值一次聚合完成）
+    key_stats = df[['Sales', 'Quantity', 'Price']].agg(['sum', 'mean'])
+    total_sales = key_stats.at['sum', 'Sales']
+    avg_order_value = key_stats.at['mean', 'Sales']
     total_orders = len(df)
-    avg_quantity = df['Quantity'].mean()
-    avg_price = df['Price'].mean()
+    avg_quantity = key_stats.at['mean', 'Quantity']
+    avg_price = key_stats.at['mean', 'Price']
     
-    # 地区表现分析
-    region_performance = df.groupby('Region').agg({
-        'Sales': ['sum', 'mean', 'count'],
-        'Quantity': 'mean',
-        'Price': 'mean'
-    }).round(2)
-    region_performance.columns = ['总销售额', '平均订单金额', '订单数量', '平均数量', '平均价格']
-    region_performance = region_performance.sort_values('总销售额', ascending=False)
+    if region_performance is None or product_performance is None:
+        region_performance, product_performance = compute_performance(df)
     
-    # 产品表现分析
-    product_performance = df.groupby('Product').agg({
-        'Sales': ['sum', 'mean', 'count'],
-        'Quantity': 'sum',
-        'Price': 'mean'
-    }).round(2)
-    product_performance.columns = ['总销售额', '平均订单金额', '销售次数', '总销量', '平均价格']
-    product_performance = product_performance.sort_values('总销售额', ascending=False)
+    # Markdown表格：先整列格式化，再一次性输出（避免逐行 .loc 查找）
+    region_table = _format_currency(
+        region_performance[['总销售额', '平均订单金额', '订单数量']], ['总销售额', '平均订单金额']
+    ).rename_axis('地区').to_markdown()
+    product_table = _format_currency(
+        product_performance.head(5)[['总销售额', '销售次数', '平均价格']], ['总销售额', '平均价格']
+    ).rename_axis('产品').to_markdown()
     
     # 生成报告内容
     report_content = f"""
@@ -230,34 +318,14 @@ def generate_report(df, grouped_data):
 
 ## 地区表现分析
 
-| 地区 | 总销售额 | 平均订单金额 | 订单数量 |
-|------|----------|--------------|----------|
-"""
-    
-    # 添加地区表现数据
-    for region in region_performance.index:
-        sales = region_performance.loc[region, '总销售额']
-        avg_sales = region_performance.loc[region, '平均订单金额']
-        orders = region_performance.loc[region, '订单数量']
-        report_content += f"| {region} | ¥{sales:,.2f} | ¥{avg_sales:.2f} | {orders} |\n"
-    
-    report_content += """
+{region_table}
+
 ## 产品表现分析
 
 销售额最高的前5个产品：
 
-| 产品 | 总销售额 | 销售次数 | 平均价格 |
-|------|----------|----------|----------|
-"""
-    
-    # 添加产品表现数据
-    for i, product in enumerate(product_performance.head(5).index):
-        sales = product_performance.loc[product, '总销售额']
-        count = product_performance.loc[product, '销售次数']
-        avg_price = product_performance.loc[product, '平均价格']
-        report_content += f"| {product} | ¥{sales:,.2f} | {count} | ¥{avg_price:.2f} |\n"
-    
-    report_content += """
+{product_table}
+
 ## 业务见解
 
 ### 主要发现：
@@ -288,7 +356,7 @@ def generate_report(df, grouped_data):
     
     print("分析报告已保存到 report/analysis_report.md")
 
-def save_analysis_results(df, grouped_data, output_dir):
+def save_analysis_results(df, grouped_data, output_dir, product_performance=None):
     """保存分析结果"""
     print("\n=== 保存分析结果 ===")
     
@@ -296,33 +364,22 @@ def save_analysis_results(df, grouped_data, output_dir):
     os.makedirs(output_dir, exist_ok=True)
     
     # 保存原始数据（带Sales列）
-    df_with_sales = df.copy()
-    df_with_sales.to_csv(
-        os.path.join(output_dir, 'sales_data_with_analysis.csv'), 
-        index=False, 
-        encoding='utf-8-sig'
-    )
+    write_csv(df, os.path.join(output_dir, 'sales_data_with_analysis.csv'))
     print(f"✓ 完整销售数据已保存到: {output_dir}/sales_data_with_analysis.csv")
     
     # 保存分组统计结果（中英文对照）
-    grouped_results = grouped_data.copy()
-    grouped_results.index.name = '地区 (Region)'
-    grouped_results.to_csv(
-        os.path.join(output_dir, 'region_sales_summary.csv'), 
-        encoding='utf-8-sig'
-    )
+    grouped_results = grouped_data.rename_axis('地区 (Region)')
+    write_csv(grouped_results, os.path.join(output_dir, 'region_sales_summary.csv'), index=True)
     print(f"✓ 地区销售汇总已保存到: {output_dir}/region_sales_summary.csv")
     
     # 创建产品销售汇总（中英文对照）
-    product_summary = df.groupby('Product')['Sales'].agg(['sum', 'count', 'mean']).round(2)
+    if product_performance is None:
+        _, product_performance = compute_performance(df)
+    product_summary = product_performance[['总销售额', '销售次数', '平均订单金额']]
     product_summary.columns = ['总销售额 (Total Sales)', '订单数 (Order Count)', '平均订单金额 (Avg Order Value)']
     product_summary.index.name = '产品 (Product)'
-    product_summary = product_summary.sort_values('总销售额 (Total Sales)', ascending=False)
     
-    product_summary.to_csv(
-        os.path.join(output_dir, 'product_sales_summary.csv'), 
-        encoding='utf-8-sig'
-    )
+    write_csv(product_summary, os.path.join(output_dir, 'product_sales_summary.csv'), index=True)
     print(f"✓ 产品销售汇总已保存到: {output_dir}/product_sales_summary.csv")
     
     # 创建日期销售汇总（如果有Date列）
@@ -332,16 +389,21 @@ def save_analysis_results(df, grouped_data, output_dir):
         daily_summary.columns = ['日销售额 (Daily Sales)', '订单数 (Order Count)', '平均订单金额 (Avg Order Value)']
         daily_summary.index.name = '日期 (Date)'
         
-        daily_summary.to_csv(
-            os.path.join(output_dir, 'daily_sales_summary.csv'), 
-            encoding='utf-8-sig'
-        )
+        write_csv(daily_summary, os.path.join(output_dir, 'daily_sales_summary.csv'), index=True)
         print(f"✓ 日销售汇总已保存到: {output_dir}/daily_sales_summary.csv")
     
     print("✓ 所有分析结果保存完成！")
 
 if __name__ == "__main__":
-    success = main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='销售数据分析项目')
+    parser.add_argument('--plots', action='store_true', help='同时生成PNG图表（默认只生成报告数据）')
+    parser.add_argument('--publish', action='store_true', help=f'以 {PUBLISH_DPI} dpi 输出发布用图表（隐含 --plots）')
+    args = parser.parse_args()
+    
+    success = main(make_plots=args.plots or args.publish,
+                   dpi=PUBLISH_DPI if args.publish else DRAFT_DPI)
     if success:
         print("\n项目执行成功！请查看输出文件。")
     else:
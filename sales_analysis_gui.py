@@ -21,23 +21,46 @@ import os
 from pathlib import Path
 from datetime import datetime
 import time
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
+import functools
+
+try:
+    import numexpr as ne
+    ne.set_num_threads(os.cpu_count() or 1)
+    HAS_NUMEXPR = True  # 大数组归约分块多线程计算
+except ImportError:
+    HAS_NUMEXPR = False
+
+# 小于该行数时 numexpr 的调用开销大于收益，直接使用 pandas
+NUMEXPR_MIN_ROWS = 10_000
+
+# 折线类图表发送到浏览器的最大点数，超过时降采样/按周汇总
+MAX_PLOT_POINTS = 1000
+
+# 累积分布图的分箱数
+CDF_BINS = 512
+
+# 处理汇总表的列（每个文件一行）
+SUMMARY_COLUMNS = ['file', 'success', 'total_rows', 'total_sales', 'total_columns', 'error']
 
 # 配置中文字体支持
+@functools.lru_cache(maxsize=1)
 def setup_chinese_fonts():
-    """配置中文字体支持"""
-    # matplotlib 字体配置
+    """配置 matplotlib 中文字体（界面图表均为 Plotly，仅在需要 matplotlib 绘图时调用，只执行一次）"""
+    import matplotlib.pyplot as plt
+    import matplotlib.font_manager as fm
+    
     try:
-        # 尝试使用系统中的中文字体
+        # 尝试使用系统中的中文字体（逐个查找，不遍历整个字体列表）
         chinese_fonts = ['Microsoft YaHei', 'SimHei', 'SimSun', 'FangSong']
-        available_fonts = [f.name for f in fm.fontManager.ttflist]
         
         for font in chinese_fonts:
-            if font in available_fonts:
-                plt.rcParams['font.sans-serif'] = [font]
-                plt.rcParams['axes.unicode_minus'] = False
-                break
+            try:
+                fm.findfont(fm.FontProperties(family=font), fallback_to_default=False)
+            except ValueError:
+                continue
+            plt.rcParams['font.sans-serif'] = [font]
+            plt.rcParams['axes.unicode_minus'] = False
+            break
         else:
             # 如果没有找到中文字体，使用默认配置
             plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
@@ -45,14 +68,12 @@ def setup_chinese_fonts():
     except Exception as e:
         print(f"字体配置警告: {e}")
 
-# 初始化字体配置
-setup_chinese_fonts()
-
 # 添加 scripts 目录到路径
 sys.path.append('scripts')
 
 try:
-    from scripts.multi_file_processor import MultiFileProcessor
+    from scripts.multi_file_processor import MultiFileProcessor, HAS_POLARS
+    from scripts.data_utils import write_csv
 except ImportError:
     st.error("无法导入 MultiFileProcessor 模块，请确认 scripts/multi_file_processor.py 文件存在")
     st.stop()
@@ -109,16 +130,27 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # 初始化会话状态
+# 注意：session_state 按引用保存对象（不做序列化），大DataFrame直接放在这里即可；
+# st.cache_resource 的返回值在所有用户会话之间共享（如 load_and_process_file），
+# 放入会话状态前须先复制可变的外层容器，只共享不会被修改的 DataFrame
 if 'processor' not in st.session_state:
     st.session_state.processor = MultiFileProcessor()
 if 'processed_results' not in st.session_state:
     st.session_state.processed_results = {}
+if 'summary_df' not in st.session_state:
+    st.session_state.summary_df = pd.DataFrame(columns=SUMMARY_COLUMNS)  # 每文件一行的处理汇总，概览页直接做列归约
 if 'combined_data' not in st.session_state:
     st.session_state.combined_data = None
+if 'report' not in st.session_state:
+    st.session_state.report = None  # 生成的分析报告，处理新文件后失效
 if 'scanned_files' not in st.session_state:
     st.session_state.scanned_files = []
 if 'scan_completed' not in st.session_state:
     st.session_state.scan_completed = False
+if 'lazy_summary' not in st.session_state:
+    st.session_state.lazy_summary = None  # 目录惰性汇总结果（process_all_lazy）
+if 'file_sizes' not in st.session_state:
+    st.session_state.file_sizes = {}  # 扫描时记录的文件大小（字节），避免每次重跑重复 stat
 
 def main():
     """主函数"""
@@ -169,6 +201,74 @@ def main():
     with tab4:
         report_export_tab()
 
+@st.cache_resource(show_spinner=False)
+def load_and_process_file(path, mtime):
+    """处理单个文件并缓存处理结果
+    
+    以 (路径, 修改时间) 为缓存键，文件被修改后自动失效；
+    返回 MultiFileProcessor.processed_files 中该文件的记录。
+    使用 cache_resource 按引用返回，命中时不再序列化/反序列化整个DataFrame；
+    返回的记录在所有会话之间共享，调用方须先浅拷贝记录（及其 summary）再登记或修改，
+    其中的 DataFrame 只读使用，如需修改必须先 .copy()
+    """
+    processor = MultiFileProcessor()
+    processor.process_single_file(path)
+    processor.wait_for_charts()
+    return processor.processed_files[Path(path).name]
+
+@st.cache_data(ttl=30, show_spinner=False)
+def scan_data_files(data_path):
+    """扫描数据目录，返回 (文件列表, {文件路径: 字节数})
+    
+    每个文件只 stat 一次；结果缓存30秒，"重新扫描" 会清除缓存强制刷新
+    """
+    files = MultiFileProcessor().scan_directory(data_path)
+    return files, {file_path: os.path.getsize(file_path) for file_path in files}
+
+def build_file_table(files, data_path, file_sizes):
+    """构建文件选择表（默认全部选中）
+    
+    按列构建：每列一个列表/数组，直接交给 DataFrame，不再逐行拼字典
+    """
+    paths = [Path(file_path) for file_path in files]
+    
+    # 创建相对路径显示（数据目录外的文件保留原路径），字符串前缀判断代替逐个 try/except
+    data_root = os.path.join(os.path.abspath(data_path), '')
+    relative_paths = []
+    for file_path in files:
+        abs_path = os.path.abspath(file_path)
+        relative_paths.append(os.path.relpath(abs_path, data_root) if abs_path.startswith(data_root) else str(file_path))
+    
+    sizes = np.fromiter((file_sizes.get(file_path, 0) for file_path in files), dtype=np.float64, count=len(files))
+    
+    return pd.DataFrame({
+        "选中": np.ones(len(files), dtype=bool),
+        "文件名": [p.name for p in paths],
+        "相对路径": relative_paths,
+        "类型": [p.suffix for p in paths],
+        "大小 (MB)": np.round(sizes / (1024 * 1024), 2),
+        "完整路径": [str(p) for p in paths]
+    })
+
+def set_file_selection(update):
+    """批量修改文件选择状态（全选/全不选/反选）
+    
+    先把 data_editor 中尚未写回的勾选合并到选择数组，再用 update
+    对整个布尔数组做一次向量化修改，然后清除编辑器状态，让表格按新的选择渲染；
+    返回新的文件表，按钮位于表格之前，本次运行直接使用即可，无需 st.rerun()
+    """
+    file_table = st.session_state.file_table.copy()
+    selected = file_table['选中'].to_numpy(dtype=bool, copy=True)
+    edited_rows = st.session_state.get('file_editor', {}).get('edited_rows', {})
+    edits = {int(row): changes['选中'] for row, changes in edited_rows.items() if '选中' in changes}
+    if edits:
+        selected[list(edits)] = list(edits.values())
+    
+    file_table['选中'] = update(selected)
+    st.session_state.file_table = file_table
+    st.session_state.pop('file_editor', None)
+    return file_table
+
 def file_processing_tab(data_path, max_files, save_separate, save_combined):
     """文件处理标签页"""
     st.header("📂 文件处理")
@@ -196,13 +296,18 @@ def file_processing_tab(data_path, max_files, save_separate, save_combined):
                 
                 with st.spinner("正在处理推荐的销售数据文件..."):
                     try:
-                        # 直接处理推荐文件
-                        result = st.session_state.processor.process_single_file(recommended_file)
+                        # 直接处理推荐文件（按路径+修改时间缓存，文件未变化时不重复处理）
+                        filename = os.path.basename(recommended_file)
+                        cached_entry = load_and_process_file(recommended_file, os.path.getmtime(recommended_file))
+                        # 缓存的记录被所有会话共享：登记浅拷贝，图表路径等只写入本会话的副本
+                        entry = {**cached_entry, 'summary': dict(cached_entry['summary']),
+                                 'visualization_files': list(cached_entry['visualization_files'])}
+                        st.session_state.processor.processed_files[filename] = entry
+                        result = (entry['processed_data'], entry['summary'])
                         
                         # process_single_file 返回 (df_clean, summary)
                         if result is not None and len(result) == 2:
                             df_processed, summary = result
-                            filename = os.path.basename(recommended_file)
                             
                             # 存储处理结果 - 修正数据结构
                             st.session_state.processed_results[filename] = {
@@ -210,6 +315,8 @@ def file_processing_tab(data_path, max_files, save_separate, save_combined):
                                 'data': df_processed,
                                 'summary': summary
                             }
+                            st.session_state.summary_df = build_summary_df(st.session_state.processed_results)
+                            st.session_state.report = None
                             
                             # 保存结果 - 传入DataFrame列表
                             saved_files = st.session_state.processor.save_results(
@@ -238,8 +345,6 @@ def file_processing_tab(data_path, max_files, save_separate, save_combined):
                                 st.write("**生成的文件:**")
                                 for file_path in saved_files:
                                     st.write(f"- {file_path}")
-                            
-                            st.rerun()
                         else:
                             st.error("处理推荐文件时出错")
                             
@@ -274,7 +379,7 @@ def file_processing_tab(data_path, max_files, save_separate, save_combined):
         st.subheader("扫描数据文件")
         
         # 扫描按钮
-        col_scan, col_reset = st.columns([1, 1])
+        col_scan, col_reset, col_lazy = st.columns([1, 1, 1])
         with col_scan:
             if st.button("🔍 扫描文件", type="primary"):
                 print(f"\n🔍 GUI: 用户点击扫描文件按钮")
@@ -282,12 +387,12 @@ def file_processing_tab(data_path, max_files, save_separate, save_combined):
                 
                 with st.spinner("正在扫描文件..."):
                     try:
-                        files = st.session_state.processor.scan_directory(data_path)
+                        files, file_sizes = scan_data_files(data_path)
                         st.session_state.scanned_files = files
+                        st.session_state.file_sizes = file_sizes
                         st.session_state.scan_completed = True
                         print(f"✅ GUI: 扫描完成，发现 {len(files)} 个文件")
                         st.success(f"发现 {len(files)} 个数据文件")
-                        st.rerun()
                         
                     except Exception as e:
                         print(f"❌ GUI: 扫描文件时出错: {str(e)}")
@@ -297,12 +402,36 @@ def file_processing_tab(data_path, max_files, save_separate, save_combined):
         with col_reset:
             if st.button("🔄 重新扫描"):
                 st.session_state.scanned_files = []
+                st.session_state.file_sizes = {}
                 st.session_state.scan_completed = False
+                scan_data_files.clear()
                 # 清除之前的选择状态
-                keys_to_remove = [key for key in st.session_state.keys() if key.startswith('file_selected_')]
-                for key in keys_to_remove:
-                    del st.session_state[key]
-                st.rerun()
+                st.session_state.pop('file_table', None)
+                st.session_state.pop('file_editor', None)
+        
+        with col_lazy:
+            # 只需整体汇总时，用 Polars 惰性查询直接汇总整个目录，不加载和保留明细数据
+            if HAS_POLARS and st.button("⚡ 快速汇总目录", help="用 Polars 流式汇总目录下所有CSV销售数据的地区与产品排行"):
+                with st.spinner("正在汇总目录中的CSV销售数据..."):
+                    try:
+                        st.session_state.lazy_summary = st.session_state.processor.process_all_lazy(data_path)
+                        if st.session_state.lazy_summary is None:
+                            st.warning("目录中没有可汇总的CSV销售数据")
+                    except Exception as e:
+                        print(f"❌ GUI: 快速汇总目录时出错: {str(e)}")
+                        st.error(f"快速汇总目录时出错: {str(e)}")
+        
+        lazy_summary = st.session_state.lazy_summary
+        if lazy_summary:
+            st.markdown(f"**⚡ 目录快速汇总:** {lazy_summary['total_files']} 个文件，"
+                        f"{lazy_summary['total_records']:,} 条记录，总销售额 {lazy_summary['total_sales']:,.2f}")
+            col_regions, col_products = st.columns(2)
+            with col_regions:
+                st.dataframe(pd.Series(lazy_summary['top_regions'], name='总销售额').rename_axis('地区'),
+                             use_container_width=True)
+            with col_products:
+                st.dataframe(pd.Series(lazy_summary['top_products'], name='总销售额').rename_axis('产品'),
+                             use_container_width=True)
         
         # 显示扫描结果和文件选择
         if st.session_state.scan_completed and st.session_state.scanned_files:
@@ -316,70 +445,39 @@ def file_processing_tab(data_path, max_files, save_separate, save_combined):
             # 显示文件列表并允许选择
             st.subheader("📋 选择要处理的文件")
             
+            # 文件信息表只在扫描结果变化时构建一次
+            file_table = st.session_state.get('file_table')
+            if file_table is None or file_table['完整路径'].tolist() != [str(Path(f)) for f in files]:
+                file_table = build_file_table(files, data_path, st.session_state.file_sizes)
+                st.session_state.file_table = file_table
+                st.session_state.pop('file_editor', None)
+            
             # 全选/全不选按钮
             col_select1, col_select2, col_select3 = st.columns(3)
             with col_select1:
                 if st.button("✅ 全选"):
-                    for i, file_path in enumerate(files):
-                        st.session_state[f"file_selected_{i}"] = True
-                    st.rerun()
+                    file_table = set_file_selection(np.ones_like)
             
             with col_select2:
                 if st.button("❌ 全不选"):
-                    for i, file_path in enumerate(files):
-                        st.session_state[f"file_selected_{i}"] = False
-                    st.rerun()
+                    file_table = set_file_selection(np.zeros_like)
             
             with col_select3:
                 if st.button("🔄 反选"):
-                    for i, file_path in enumerate(files):
-                        current_state = st.session_state.get(f"file_selected_{i}", False)
-                        st.session_state[f"file_selected_{i}"] = not current_state
-                    st.rerun()
-            
-            # 文件选择列表
-            file_data = []
-            selected_files = []
+                    file_table = set_file_selection(np.logical_not)
             
-            # 使用容器来避免重新渲染问题
-            file_container = st.container()
-            
-            with file_container:
-                for i, file_path in enumerate(files):
-                    file_path_obj = Path(file_path)
-                    file_size = file_path_obj.stat().st_size / (1024 * 1024)  # MB
-                    
-                    # 创建相对路径显示
-                    try:
-                        relative_path = file_path_obj.relative_to(Path(data_path))
-                    except ValueError:
-                        relative_path = file_path_obj
-                    
-                    # 文件选择复选框 - 使用唯一的key
-                    checkbox_key = f"file_selected_{i}"
-                    is_selected = st.checkbox(
-                        f"{relative_path} ({file_size:.2f} MB)",
-                        key=checkbox_key,
-                        value=st.session_state.get(checkbox_key, True)  # 默认选中
-                    )
-                    
-                    if is_selected:
-                        selected_files.append(file_path)
-                    
-                    file_data.append({
-                        "选中": "✅" if is_selected else "❌",
-                        "文件名": file_path_obj.name,
-                        "相对路径": str(relative_path),
-                        "类型": file_path_obj.suffix,
-                        "大小 (MB)": f"{file_size:.2f}",
-                        "完整路径": str(file_path_obj)
-                    })
-            
-            # 显示文件信息表格
-            if file_data:
-                st.subheader("📊 文件详情")
-                df_files = pd.DataFrame(file_data)
-                st.dataframe(df_files, use_container_width=True)
+            # 文件选择表格：单个 data_editor 替代逐个复选框
+            edited = st.data_editor(
+                file_table,
+                column_config={
+                    "选中": st.column_config.CheckboxColumn("选中", required=True),
+                },
+                disabled=["文件名", "相对路径", "类型", "大小 (MB)", "完整路径"],
+                hide_index=True,
+                use_container_width=True,
+                key="file_editor"
+            )
+            selected_files = edited.loc[edited['选中'], '完整路径'].tolist()
             
             # 显示选中的文件统计
             st.info(f"已选中 {len(selected_files)} / {len(files)} 个文件")
@@ -395,13 +493,13 @@ def file_processing_tab(data_path, max_files, save_separate, save_combined):
                             relative_path = Path(file_path).relative_to(Path(data_path))
                         except ValueError:
                             relative_path = Path(file_path)
-                        print(f"  {i}. {relative_path} ({Path(file_path).stat().st_size / (1024 * 1024):.2f} MB)")
+                        print(f"  {i}. {relative_path} ({st.session_state.file_sizes.get(file_path, 0) / (1024 * 1024):.2f} MB)")
                     process_files(selected_files, save_separate, save_combined)
             else:
                 st.warning("请至少选择一个文件进行处理")
         
         elif st.session_state.scan_completed and not st.session_state.scanned_files:
-            st.warning(f"在路径 '{data_path}' 中未发现任何 CSV 或 XLSX 文件")
+            st.warning(f"在路径 '{data_path}' 中未发现任何 CSV、XLSX 或 Parquet 文件")
         
         elif not st.session_state.scan_completed:
             st.info("点击 '🔍 扫描文件' 按钮开始扫描数据文件")
@@ -410,35 +508,51 @@ def file_processing_tab(data_path, max_files, save_separate, save_combined):
         st.subheader("📊 处理状态")
         
         if st.session_state.processed_results:
-            # 修复数据结构检查
-            success_count = 0
-            total_count = len(st.session_state.processed_results)
-            
-            for result in st.session_state.processed_results.values():
-                # 检查不同的数据结构
-                if isinstance(result, dict) and result.get('success', False):
-                    success_count += 1
-                elif isinstance(result, tuple) and len(result) == 2:
-                    # 如果是元组，说明处理成功
-                    success_count += 1
+            summary_df = st.session_state.summary_df
+            success_count = int(summary_df['success'].sum())
+            total_count = len(summary_df)
             
             st.metric("成功处理", success_count, delta=f"{total_count} 总计")
             
             # 显示处理结果
-            for file_name, result in st.session_state.processed_results.items():
-                if isinstance(result, dict):
-                    if result.get('success', False):
-                        st.success(f"✅ {Path(file_name).name}")
-                    else:
-                        st.error(f"❌ {Path(file_name).name}: {result.get('error', '未知错误')}")
-                elif isinstance(result, tuple) and len(result) == 2:
-                    # 元组表示成功处理
+            for file_name, success, error in zip(summary_df['file'], summary_df['success'], summary_df['error']):
+                if success:
                     st.success(f"✅ {Path(file_name).name}")
                 else:
-                    st.error(f"❌ {Path(file_name).name}: 数据格式错误")
+                    st.error(f"❌ {Path(file_name).name}: {error}")
         else:
             st.info("尚未处理任何文件")
 
+# 低基数字符串列，合并后统一转为 category，之后的筛选/分组都基于整数编码
+CATEGORY_COLUMNS = ['Region', 'Product', 'Source_File']
+
+def categorize_columns(df):
+    """将 Region/Product/Source_File 转换为 category 类型（数据合并后只做一次）"""
+    if df is None:
+        return None
+    return df.assign(**{col: df[col].astype('category') for col in CATEGORY_COLUMNS if col in df.columns})
+
+def build_summary_df(results):
+    """将处理结果字典整理为每文件一行的汇总表（处理完成时构建一次）"""
+    rows = []
+    for file_name, result in results.items():
+        if isinstance(result, tuple) and len(result) == 2:
+            # 元组 (df, summary) 表示处理成功
+            result = {'success': True, 'summary': result[1]}
+        elif not isinstance(result, dict):
+            result = {'error': '数据格式错误'}
+        success = bool(result.get('success', False))
+        summary = (result.get('summary') or {}) if success else {}
+        rows.append((
+            file_name,
+            success,
+            summary.get('total_rows', 0),
+            summary.get('total_sales', 0),
+            summary.get('total_columns', 0),
+            '' if success else result.get('error', '未知错误'),
+        ))
+    return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
 def process_files(files, save_separate, save_combined):
     """处理文件"""
     progress_bar = st.progress(0)
@@ -450,14 +564,19 @@ def process_files(files, save_separate, save_combined):
     for i, file_path in enumerate(files, 1):
         print(f"  {i}. {Path(file_path).name}")
     
+    last_update = 0.0
+    
     def progress_callback(current, total, message):
-        progress = current / total
-        progress_bar.progress(progress)
-        status_text.text(f"进度: {current}/{total} - {message}")
+        nonlocal last_update
         # 控制台同步显示进度
         print(f"📊 GUI进度: [{current}/{total}] {message}")
-        # 强制刷新页面状态
-        time.sleep(0.1)
+        # 界面更新限频到约20次/秒（最后一个文件总是刷新），不阻塞处理
+        now = time.monotonic()
+        if now - last_update < 0.05 and current < total:
+            return
+        last_update = now
+        progress_bar.progress(current / total)
+        status_text.text(f"进度: {current}/{total} - {message}")
     
     try:
         # 添加调试信息
@@ -467,9 +586,11 @@ def process_files(files, save_separate, save_combined):
         # 处理文件
         results = st.session_state.processor.process_multiple_files(files, progress_callback)
         st.session_state.processed_results = results
+        st.session_state.summary_df = build_summary_df(results)
+        st.session_state.report = None
         
         # 检查处理结果
-        success_count = sum(1 for r in results.values() if r.get('success', False))
+        success_count = int(st.session_state.summary_df['success'].sum())
         print(f"✅ GUI: 文件处理完成 - 成功: {success_count}/{len(files)}")
         st.info(f"文件处理完成：{success_count}/{len(files)} 个文件成功处理")
         
@@ -477,7 +598,7 @@ def process_files(files, save_separate, save_combined):
         if save_combined:
             print(f"🔗 GUI: 开始合并数据...")
             status_text.text("正在合并数据...")
-            st.session_state.combined_data = st.session_state.processor.combine_all_data()
+            st.session_state.combined_data = categorize_columns(st.session_state.processor.combine_all_data())
             print(f"✅ GUI: 数据合并完成，合并后数据行数: {len(st.session_state.combined_data)}")
             st.info("数据合并完成")
         
@@ -518,13 +639,12 @@ def process_files(files, save_separate, save_combined):
         # 显示处理详情
         if results:
             st.subheader("📋 处理详情")
-            for filename, result in results.items():
-                if result.get('success', False):
-                    summary = result.get('summary', {})
-                    rows = summary.get('total_rows', 0)
+            summary_df = st.session_state.summary_df
+            for filename, success, rows, error in zip(summary_df['file'], summary_df['success'],
+                                                      summary_df['total_rows'], summary_df['error']):
+                if success:
                     st.success(f"✅ {filename}: {rows} 行数据")
                 else:
-                    error = result.get('error', '未知错误')
                     st.error(f"❌ {filename}: {error}")
         
         print(f"🎯 GUI: 所有处理操作完成!")
@@ -541,6 +661,18 @@ def process_files(files, save_separate, save_combined):
         print(f"详细错误信息:\n{error_details}")
         st.expander("详细错误信息").code(error_details)
 
+def sales_sum_max_min(sales):
+    """计算 Sales 的总和/最大值/最小值（忽略缺失值）"""
+    if HAS_NUMEXPR and len(sales) > NUMEXPR_MIN_ROWS:
+        local_dict = {'s': sales.to_numpy(dtype=np.float64, na_value=np.nan), 'inf': np.inf}
+        # s == s 为 False 的位置即 NaN，用单位元替换后再归约
+        return (
+            float(ne.evaluate('sum(where(s == s, s, 0))', local_dict=local_dict)),
+            float(ne.evaluate('max(where(s == s, s, -inf))', local_dict=local_dict)),
+            float(ne.evaluate('min(where(s == s, s, inf))', local_dict=local_dict)),
+        )
+    return sales.sum(), sales.max(), sales.min()
+
 def data_overview_tab():
     """数据概览标签页"""
     st.header("📊 数据概览")
@@ -552,16 +684,12 @@ def data_overview_tab():
     # 总体统计
     col1, col2, col3, col4 = st.columns(4)
     
-    total_files = len(st.session_state.processed_results)
-    success_files = sum(1 for r in st.session_state.processed_results.values() if r.get('success', False))
-    total_records = 0
-    total_sales = 0
-    
-    for result in st.session_state.processed_results.values():
-        if result.get('success', False) and 'summary' in result:
-            summary = result['summary']
-            total_records += summary.get('total_rows', 0)
-            total_sales += summary.get('total_sales', 0)
+    # 汇总表在处理完成时已构建，这里只做列归约
+    summary_df = st.session_state.summary_df
+    total_files = len(summary_df)
+    success_files = int(summary_df['success'].sum())
+    total_records = int(summary_df['total_rows'].sum())
+    total_sales = float(summary_df['total_sales'].sum())
     
     with col1:
         st.metric("处理文件数", success_files, delta=f"{total_files} 总计")
@@ -585,28 +713,14 @@ def data_overview_tab():
     # 文件详细信息
     st.subheader("📋 文件详细信息")
     
-    file_details = []
-    for file_name, result in st.session_state.processed_results.items():
-        if result.get('success', False) and 'summary' in result:
-            summary = result['summary']
-            file_details.append({
-                "文件名": file_name,
-                "记录数": summary.get('total_rows', 0),
-                "列数": summary.get('total_columns', 0),
-                "销售额": summary.get('total_sales', 0),
-                "状态": "✅ 成功"
-            })
-        else:
-            file_details.append({
-                "文件名": file_name,
-                "记录数": 0,
-                "列数": 0,
-                "销售额": 0,
-                "状态": f"❌ 失败: {result.get('error', '未知错误')}"
-            })
-    
-    if file_details:
-        df_details = pd.DataFrame(file_details)
+    if not summary_df.empty:
+        df_details = pd.DataFrame({
+            "文件名": summary_df['file'],
+            "记录数": summary_df['total_rows'],
+            "列数": summary_df['total_columns'],
+            "销售额": summary_df['total_sales'],
+            "状态": np.where(summary_df['success'], "✅ 成功", "❌ 失败: " + summary_df['error'].astype(str)),
+        })
         st.dataframe(df_details, use_container_width=True)
     
     # 数据预览
@@ -623,9 +737,10 @@ def data_overview_tab():
             df = st.session_state.combined_data
             
             if 'Sales' in df.columns:
-                st.metric("销售额总计", f"{df['Sales'].sum():,.2f}")
-                st.metric("最高单笔销售", f"{df['Sales'].max():,.2f}")
-                st.metric("最低单笔销售", f"{df['Sales'].min():,.2f}")
+                sales_total, sales_max, sales_min = sales_sum_max_min(df['Sales'])
+                st.metric("销售额总计", f"{sales_total:,.2f}")
+                st.metric("最高单笔销售", f"{sales_max:,.2f}")
+                st.metric("最低单笔销售", f"{sales_min:,.2f}")
             
             if 'Region' in df.columns:
                 st.metric("地区数量", df['Region'].nunique())
@@ -655,9 +770,15 @@ def visualization_tab(chart_theme, show_data_labels):
         
         # 数据过滤选项
         if 'Region' in df.columns:
-            regions = ['全部'] + list(df['Region'].unique())
+            # category 列直接使用类别表作为选项，无需扫描整列求 unique
+            if isinstance(df['Region'].dtype, pd.CategoricalDtype):
+                region_options = df['Region'].cat.categories.tolist()
+            else:
+                region_options = list(df['Region'].unique())
+            regions = ['全部'] + region_options
             selected_region = st.selectbox("筛选地区", regions)
             if selected_region != '全部':
+                # category 列的等值比较在内部按整数编码完成
                 df = df[df['Region'] == selected_region]
         
         if 'Source_File' in df.columns:
@@ -682,16 +803,76 @@ def visualization_tab(chart_theme, show_data_labels):
         elif chart_type == "综合仪表板":
             create_comprehensive_dashboard(df, chart_theme)
 
-def create_region_sales_chart(df, theme, show_labels):
-    """创建地区销售分析图表"""
-    if 'Region' not in df.columns or 'Sales' not in df.columns:
-        st.warning("数据中缺少 Region 或 Sales 列")
-        return
+def aggregate_sales_by(df, key):
+    """按 key 分组，一次性计算 Sales 的 sum/count/mean
+    
+    pd.factorize 得到分组编码后用 np.bincount 计算加权和与计数，
+    均值由两者相除得到，避免 groupby().agg 对 Sales 列的多次遍历；
+    category 列直接复用其整数编码，无需再次 factorize
+    """
+    column = df[key]
+    is_categorical = isinstance(column.dtype, pd.CategoricalDtype)
+    if is_categorical:
+        codes, uniques = column.cat.codes.to_numpy(), column.cat.categories
+    else:
+        codes, uniques = pd.factorize(column, sort=True)
+    sales = df['Sales'].to_numpy(dtype=np.float64, na_value=np.nan)
+    
+    # 与 groupby 一致：忽略缺失的分组键与缺失的销售额
+    valid = (codes >= 0) & ~np.isnan(sales)
+    sums = np.bincount(codes[valid], weights=sales[valid], minlength=len(uniques))
+    counts = np.bincount(codes[valid], minlength=len(uniques))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    
+    result = pd.DataFrame({'sum': sums, 'count': counts, 'mean': means},
+                          index=pd.Index(uniques, name=key))
+    if is_categorical:
+        # 只保留数据中实际出现的类别（与 groupby(observed=True) 一致）
+        result = result[np.bincount(codes[codes >= 0], minlength=len(uniques)) > 0]
+    return result
+
+@st.cache_data(show_spinner=False)
+def cached_histogram(values, nbins=30):
+    """用 np.histogram 分箱并缓存，返回 (counts, edges)
+    
+    产品、趋势、分布等面板对同一 Sales 列只分箱一次，之后的重跑直接命中缓存
+    """
+    values = values.dropna().to_numpy(dtype=np.float64)
+    return np.histogram(values, bins=nbins)
+
+def binned_histogram_trace(counts, edges, name='销售额分布'):
+    """由预先分箱的结果 (counts, edges) 构建柱状图 trace
     
-    # 按地区聚合销售数据
-    region_sales = df.groupby('Region')['Sales'].agg(['sum', 'count', 'mean']).round(2)
-    region_sales.columns = ['总销售额 (Total Sales)', '订单数 (Order Count)', '平均订单金额 (Avg Order Value)']
+    浏览器只接收 nbins 个柱子，而不是 go.Histogram 所需的全部原始数据点
+    """
+    return go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+                  name=name, showlegend=False)
+
+@st.cache_data(show_spinner=False)
+def cached_sales_agg(key_sales, key):
+    """按 key 聚合 Sales 并缓存
     
+    只传入 [key, 'Sales'] 两列，缓存哈希开销小；切换主题、标签等控件引起的重跑直接命中缓存
+    """
+    return aggregate_sales_by(key_sales, key)
+
+@st.cache_data(show_spinner=False)
+def cached_daily_sales(date_sales, date_col):
+    """按天聚合 Sales 并缓存（传入 [date_col, 'Sales'] 两列）
+    
+    处理后的数据中日期列已在加载清洗时解析为 datetime64，这里直接截断到天分组；
+    仅在日期仍为字符串时才解析一次
+    """
+    dates = date_sales[date_col]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors='coerce', cache=True)
+    days = pd.Series(dates.to_numpy().astype('datetime64[D]'), index=date_sales.index, name=date_col)
+    return date_sales['Sales'].groupby(days).agg(['sum', 'count', 'mean'])
+
+@st.cache_data(show_spinner=False)
+def build_region_sales_figure(region_sales, theme, show_labels):
+    """构建地区销售分析图表（纯函数，相同输入直接返回缓存的图）"""
     # 创建子图
     fig = make_subplots(
         rows=2, cols=2,
@@ -755,23 +936,81 @@ def create_region_sales_chart(df, theme, show_labels):
     fig.update_xaxes(title_font=dict(family="Microsoft YaHei, SimHei, Arial, sans-serif"))
     fig.update_yaxes(title_font=dict(family="Microsoft YaHei, SimHei, Arial, sans-serif"))
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+def binned_kde(values, grid_size=256):
+    """分箱近似的高斯核密度估计，返回 (网格点, 密度)
+    
+    先把数据分到 grid_size 个等宽箱，再用高斯核对箱计数做一次卷积，
+    复杂度 O(N + grid_size²)，代替 gaussian_kde 的 O(N × 网格点数)；
+    带宽与 gaussian_kde 默认的 Scott 规则一致
+    """
+    values = pd.Series(values).dropna().to_numpy(dtype=np.float64)
+    n = len(values)
+    lo, hi = (values.min(), values.max()) if n else (0.0, 0.0)
+    bandwidth = values.std(ddof=1) * n ** (-1 / 5) if n > 1 else 0.0
+    if bandwidth <= 0 or hi <= lo:
+        return np.array([]), np.array([])
+    
+    counts, edges = np.histogram(values, bins=grid_size, range=(lo, hi))
+    centers = (edges[:-1] + edges[1:]) / 2
+    step = edges[1] - edges[0]
+    
+    # 核覆盖 ±4 倍带宽（最多覆盖整个网格），full 卷积后取与网格对齐的部分
+    half = min(grid_size - 1, int(np.ceil(4 * bandwidth / step)))
+    offsets = np.arange(-half, half + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    density = np.convolve(counts, kernel)[half:half + grid_size] / (n * bandwidth * np.sqrt(2 * np.pi))
+    return centers, density
+
+@st.cache_data(show_spinner=False)
+def cached_region_product_pivot(region_product_sales, top_n=10):
+    """地区×产品销售额透视表（只保留销售额最高的 top_n 个产品）并缓存
+    
+    先选出 top_n 产品再分组，只构建 地区×top_n 的矩阵，而不是 地区×全部产品
+    """
+    top_products = region_product_sales.groupby('Product', observed=True)['Sales'].sum().nlargest(top_n).index
+    subset = region_product_sales[region_product_sales['Product'].isin(top_products)]
+    pivot_table = subset.groupby(['Region', 'Product'], observed=True)['Sales'].sum().unstack(fill_value=0)
+    return pivot_table.reindex(columns=top_products, fill_value=0)
+
+@st.cache_data(show_spinner=False)
+def cached_sales_stats(sales):
+    """Sales 的均值/中位数/标准差/分位数并缓存，返回 (mean, median, std, quantiles)
+    
+    去掉缺失值后用一次 np.quantile 求出全部分位数，中位数直接取 50% 分位
+    """
+    values = sales.to_numpy(dtype=np.float64, na_value=np.nan)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.nan, np.nan, np.nan, np.full(5, np.nan)
+    quantiles = np.quantile(values, [0.25, 0.5, 0.75, 0.9, 0.95])
+    std = values.std(ddof=1) if len(values) > 1 else np.nan
+    return values.mean(), quantiles[1], std, quantiles.round(2)
+
+def create_region_sales_chart(df, theme, show_labels):
+    """创建地区销售分析图表"""
+    if 'Region' not in df.columns or 'Sales' not in df.columns:
+        st.warning("数据中缺少 Region 或 Sales 列")
+        return
+    
+    # 按地区聚合销售数据
+    region_sales = cached_sales_agg(df[['Region', 'Sales']], 'Region').round(2)
+    region_sales.columns = ['总销售额 (Total Sales)', '订单数 (Order Count)', '平均订单金额 (Avg Order Value)']
+    
+    # 构建图表（按聚合结果与主题/标签参数缓存）
+    fig = build_region_sales_figure(region_sales, theme, show_labels)
+    
+    # 固定 key：重跑时复用同一前端组件，Plotly 以 react 方式增量更新而不是重建
+    st.plotly_chart(fig, use_container_width=True, key="region_chart")
     
     # 显示数据表
     st.subheader("📊 地区销售数据 (Regional Sales Data)")
     st.dataframe(region_sales, use_container_width=True)
 
-def create_product_sales_chart(df, theme, show_labels):
-    """创建产品销售分析图表"""
-    if 'Product' not in df.columns or 'Sales' not in df.columns:
-        st.warning("数据中缺少 Product 或 Sales 列")
-        return
-    
-    # 按产品聚合销售数据
-    product_sales = df.groupby('Product')['Sales'].agg(['sum', 'count', 'mean']).round(2)
-    product_sales.columns = ['总销售额 (Total Sales)', '订单数 (Order Count)', '平均订单金额 (Avg Order Value)']
-    product_sales = product_sales.sort_values('总销售额 (Total Sales)', ascending=False)
-    
+@st.cache_data(show_spinner=False)
+def build_product_sales_figure(product_sales, sales_hist, theme, show_labels):
+    """构建产品销售分析图表（纯函数，相同输入直接返回缓存的图）"""
     # 创建子图
     fig = make_subplots(
         rows=2, cols=2,
@@ -811,11 +1050,8 @@ def create_product_sales_chart(df, theme, show_labels):
         row=2, col=1
     )
     
-    # 销售额分布直方图
-    fig.add_trace(
-        go.Histogram(x=df['Sales'], nbinsx=30, name='销售额分布', showlegend=False),
-        row=2, col=2
-    )
+    # 销售额分布直方图（预先分箱）
+    fig.add_trace(binned_histogram_trace(*sales_hist), row=2, col=2)
 
     # 配置字体和布局
     fig.update_layout(
@@ -833,25 +1069,31 @@ def create_product_sales_chart(df, theme, show_labels):
     fig.update_xaxes(title_font=dict(family="Microsoft YaHei, SimHei, Arial, sans-serif"))
     fig.update_yaxes(title_font=dict(family="Microsoft YaHei, SimHei, Arial, sans-serif"))
     
-    st.plotly_chart(fig, use_container_width=True)
-    
-    # 显示数据表
-    st.subheader("📊 产品销售数据 (Product Sales Data)")
-    st.dataframe(product_sales.head(20), use_container_width=True)
+    return fig
 
-def create_sales_trend_chart(df, theme, show_labels):
-    """创建销售趋势分析图表"""
-    if 'Date' not in df.columns or 'Sales' not in df.columns:
-        st.warning("数据中缺少 Date 或 Sales 列")
+def create_product_sales_chart(df, theme, show_labels):
+    """创建产品销售分析图表"""
+    if 'Product' not in df.columns or 'Sales' not in df.columns:
+        st.warning("数据中缺少 Product 或 Sales 列")
         return
     
-    # 确保Date列是datetime类型
-    df['Date'] = pd.to_datetime(df['Date'])
+    # 按产品聚合销售数据
+    product_sales = cached_sales_agg(df[['Product', 'Sales']], 'Product').round(2)
+    product_sales.columns = ['总销售额 (Total Sales)', '订单数 (Order Count)', '平均订单金额 (Avg Order Value)']
+    product_sales = product_sales.sort_values('总销售额 (Total Sales)', ascending=False)
     
-    # 按日期聚合销售数据
-    daily_sales = df.groupby('Date')['Sales'].agg(['sum', 'count', 'mean']).round(2)
-    daily_sales.columns = ['日销售额 (Daily Sales)', '订单数 (Order Count)', '平均订单金额 (Avg Order Value)']
+    # 构建图表（按聚合结果与主题/标签参数缓存）
+    fig = build_product_sales_figure(product_sales, cached_histogram(df['Sales']), theme, show_labels)
     
+    st.plotly_chart(fig, use_container_width=True, key="product_chart")
+    
+    # 显示数据表
+    st.subheader("📊 产品销售数据 (Product Sales Data)")
+    st.dataframe(product_sales.head(20), use_container_width=True)
+
+@st.cache_data(show_spinner=False)
+def build_sales_trend_figure(daily_sales, sales_hist, theme):
+    """构建销售趋势分析图表（纯函数，相同输入直接返回缓存的图）"""
     # 创建子图
     fig = make_subplots(
         rows=2, cols=2,
@@ -863,9 +1105,9 @@ def create_sales_trend_chart(df, theme, show_labels):
                [{"secondary_y": False}, {"type": "histogram"}]]
     )
     
-    # 日销售额趋势线
+    # 日销售额趋势线（Scattergl 使用 WebGL 渲染，点数多时不产生大量 SVG 节点）
     fig.add_trace(
-        go.Scatter(x=daily_sales.index, y=daily_sales['日销售额 (Daily Sales)'],
+        go.Scattergl(x=daily_sales.index, y=daily_sales['日销售额 (Daily Sales)'],
                    mode='lines+markers', name='日销售额',
                    line=dict(width=2)),
         row=1, col=1
@@ -873,7 +1115,7 @@ def create_sales_trend_chart(df, theme, show_labels):
     
     # 订单数量趋势线
     fig.add_trace(
-        go.Scatter(x=daily_sales.index, y=daily_sales['订单数 (Order Count)'],
+        go.Scattergl(x=daily_sales.index, y=daily_sales['订单数 (Order Count)'],
                    mode='lines+markers', name='订单数',
                    line=dict(width=2)),
         row=1, col=2
@@ -881,17 +1123,14 @@ def create_sales_trend_chart(df, theme, show_labels):
     
     # 平均订单金额趋势线
     fig.add_trace(
-        go.Scatter(x=daily_sales.index, y=daily_sales['平均订单金额 (Avg Order Value)'],
+        go.Scattergl(x=daily_sales.index, y=daily_sales['平均订单金额 (Avg Order Value)'],
                    mode='lines+markers', name='平均订单金额',
                    line=dict(width=2)),
         row=2, col=1
     )
     
-    # 销售额分布直方图
-    fig.add_trace(
-        go.Histogram(x=df['Sales'], nbinsx=30, name='销售额分布', showlegend=False),
-        row=2, col=2
-    )
+    # 销售额分布直方图（预先分箱）
+    fig.add_trace(binned_histogram_trace(*sales_hist), row=2, col=2)
 
     # 配置字体和布局
     fig.update_layout(
@@ -910,18 +1149,41 @@ def create_sales_trend_chart(df, theme, show_labels):
     fig.update_xaxes(title_font=dict(family="Microsoft YaHei, SimHei, Arial, sans-serif"))
     fig.update_yaxes(title_font=dict(family="Microsoft YaHei, SimHei, Arial, sans-serif"))
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+def create_sales_trend_chart(df, theme, show_labels):
+    """创建销售趋势分析图表"""
+    # 标准化后的日期列为 Order_Date，兼容原始的 Date 列
+    date_col = 'Order_Date' if 'Order_Date' in df.columns else 'Date'
+    if date_col not in df.columns or 'Sales' not in df.columns:
+        st.warning("数据中缺少 Date 或 Sales 列")
+        return
+    
+    # 按日期聚合销售数据（不修改传入的数据）
+    daily_sales = cached_daily_sales(df[[date_col, 'Sales']], date_col)
+    
+    # 日期跨度过长时趋势图按周汇总，控制发送到浏览器的点数
+    trend_sales = daily_sales
+    if len(daily_sales) > MAX_PLOT_POINTS:
+        trend_sales = daily_sales[['sum', 'count']].resample('W').sum()
+        trend_sales['mean'] = trend_sales['sum'] / trend_sales['count']
+    
+    trend_columns = ['日销售额 (Daily Sales)', '订单数 (Order Count)', '平均订单金额 (Avg Order Value)']
+    daily_sales = daily_sales.round(2).set_axis(trend_columns, axis=1)
+    trend_sales = trend_sales.round(2).set_axis(trend_columns, axis=1)
+    
+    # 构建图表（按聚合结果与主题/标签参数缓存）
+    fig = build_sales_trend_figure(trend_sales, cached_histogram(df['Sales']), theme)
+    
+    st.plotly_chart(fig, use_container_width=True, key="trend_chart")
     
     # 显示数据表
     st.subheader("📊 销售趋势数据 (Sales Trend Data)")
     st.dataframe(daily_sales.tail(10), use_container_width=True)
 
-def create_sales_distribution_chart(df, theme):
-    """创建销售分布分析图表"""
-    if 'Sales' not in df.columns:
-        st.warning("数据中缺少 Sales 列")
-        return
-    
+@st.cache_data(show_spinner=False)
+def build_sales_distribution_figure(sales, theme):
+    """构建销售分布分析图表（只依赖 Sales 列与主题，相同输入直接返回缓存的图）"""
     # 创建子图
     fig = make_subplots(
         rows=2, cols=2,
@@ -929,43 +1191,35 @@ def create_sales_distribution_chart(df, theme):
                        '销售额箱线图 (Sales Box Plot)', 
                        '销售额密度图 (Sales Density)', 
                        '销售额累积分布 (Sales CDF)'),
-        specs=[[{"type": "histogram"}, {"type": "box"}],
+        specs=[[{"type": "bar"}, {"type": "box"}],
                [{"type": "scatter"}, {"type": "scatter"}]]
     )
     
-    # 销售额直方图
-    fig.add_trace(
-        go.Histogram(x=df['Sales'], nbinsx=30, name='销售额分布', showlegend=False),
-        row=1, col=1
-    )
+    # 销售额直方图（预先分箱）
+    fig.add_trace(binned_histogram_trace(*cached_histogram(sales)), row=1, col=1)
     
     # 销售额箱线图
     fig.add_trace(
-        go.Box(y=df['Sales'], name='销售额', showlegend=False),
+        go.Box(y=sales, name='销售额', showlegend=False),
         row=1, col=2
     )
     
-    # 销售额密度图（近似）
-    from scipy import stats
-    import numpy as np
-    
-    # 计算核密度估计
-    density = stats.gaussian_kde(df['Sales'].dropna())
-    x_range = np.linspace(df['Sales'].min(), df['Sales'].max(), 100)
-    y_density = density(x_range)
+    # 销售额密度图（分箱近似的核密度估计）
+    x_range, y_density = binned_kde(sales)
     
     fig.add_trace(
-        go.Scatter(x=x_range, y=y_density, mode='lines', 
+        go.Scattergl(x=x_range, y=y_density, mode='lines', 
                    name='密度', fill='tonexty', showlegend=False),
         row=2, col=1
     )
     
-    # 销售额累积分布
-    sorted_sales = np.sort(df['Sales'].dropna())
-    y_cdf = np.arange(1, len(sorted_sales) + 1) / len(sorted_sales)
+    # 销售额累积分布：由分箱计数累加得到（每个箱右边界处的 CDF 是精确值），无需整列排序
+    cdf_counts, cdf_edges = cached_histogram(sales, CDF_BINS)
+    x_cdf = cdf_edges[1:]
+    y_cdf = np.cumsum(cdf_counts) / max(cdf_counts.sum(), 1)
     
     fig.add_trace(
-        go.Scatter(x=sorted_sales, y=y_cdf, mode='lines', 
+        go.Scattergl(x=x_cdf, y=y_cdf, mode='lines', 
                    name='累积分布', showlegend=False),
         row=2, col=2
     )
@@ -986,28 +1240,39 @@ def create_sales_distribution_chart(df, theme):
     fig.update_xaxes(title_font=dict(family="Microsoft YaHei, SimHei, Arial, sans-serif"))
     fig.update_yaxes(title_font=dict(family="Microsoft YaHei, SimHei, Arial, sans-serif"))
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+def create_sales_distribution_chart(df, theme):
+    """创建销售分布分析图表"""
+    if 'Sales' not in df.columns:
+        st.warning("数据中缺少 Sales 列")
+        return
+    
+    # 构建图表（按 Sales 列与主题缓存）
+    fig = build_sales_distribution_figure(df['Sales'], theme)
+    
+    st.plotly_chart(fig, use_container_width=True, key="dist_chart")
     
     # 显示统计信息
     st.subheader("📊 销售统计信息 (Sales Statistics)")
+    sales_mean, sales_median, sales_std, quantiles = cached_sales_stats(df['Sales'])
     
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("平均值 (Mean)", f"{df['Sales'].mean():.2f}")
+        st.metric("平均值 (Mean)", f"{sales_mean:.2f}")
     with col2:
-        st.metric("中位数 (Median)", f"{df['Sales'].median():.2f}")
+        st.metric("中位数 (Median)", f"{sales_median:.2f}")
     with col3:
-        st.metric("标准差 (Std Dev)", f"{df['Sales'].std():.2f}")
+        st.metric("标准差 (Std Dev)", f"{sales_std:.2f}")
     with col4:
-        st.metric("变异系数 (CV)", f"{df['Sales'].std()/df['Sales'].mean():.2f}")
+        st.metric("变异系数 (CV)", f"{sales_std/sales_mean:.2f}")
     
     # 分位数信息
     st.subheader("📈 分位数信息 (Quantile Information)")
-    quantiles = df['Sales'].quantile([0.25, 0.5, 0.75, 0.9, 0.95]).round(2)
     quantile_df = pd.DataFrame({
         '分位数 (Quantile)': ['25%', '50% (中位数)', '75%', '90%', '95%'],
-        '销售额 (Sales Amount)': quantiles.values
+        '销售额 (Sales Amount)': quantiles
     })
     st.dataframe(quantile_df, use_container_width=True)
 
@@ -1037,18 +1302,8 @@ def create_comprehensive_dashboard(df, theme):
     # 创建多维度分析图
     if all(col in df.columns for col in ['Region', 'Product', 'Sales']):
         
-        # 热力图：地区 vs 产品
-        pivot_table = df.pivot_table(
-            values='Sales', 
-            index='Region', 
-            columns='Product', 
-            aggfunc='sum', 
-            fill_value=0
-        )
-        
-        # 只显示销售额最高的前10个产品
-        top_products = df.groupby('Product')['Sales'].sum().nlargest(10).index
-        pivot_table = pivot_table[top_products]
+        # 热力图：地区 vs 产品（只显示销售额最高的前10个产品）
+        pivot_table = cached_region_product_pivot(df[['Region', 'Product', 'Sales']])
         
         fig_heatmap = px.imshow(
             pivot_table,
@@ -1065,13 +1320,12 @@ def create_comprehensive_dashboard(df, theme):
             )
         )
         
-        st.plotly_chart(fig_heatmap, use_container_width=True)
+        st.plotly_chart(fig_heatmap, use_container_width=True, key="heatmap")
         
         # 气泡图：销售额 vs 订单数 (按地区)
         if 'Region' in df.columns:
-            bubble_data = df.groupby('Region').agg({
-                'Sales': ['sum', 'count', 'mean']
-            }).round(2)
+            # 与地区图表共用同一份缓存聚合
+            bubble_data = cached_sales_agg(df[['Region', 'Sales']], 'Region').round(2)
             bubble_data.columns = ['总销售额', '订单数', '平均订单金额']
             bubble_data = bubble_data.reset_index()
             
@@ -1094,7 +1348,7 @@ def create_comprehensive_dashboard(df, theme):
                 )
             )
             
-            st.plotly_chart(fig_bubble, use_container_width=True)
+            st.plotly_chart(fig_bubble, use_container_width=True, key="bubble")
 
 def report_export_tab():
     """报告导出标签页"""
@@ -1104,92 +1358,104 @@ def report_export_tab():
         st.info("请先处理数据文件")
         return
     
-    # 生成报告
-    if st.button("📄 生成分析报告", type="primary"):
-        try:
-            report = st.session_state.processor.generate_combined_report()
-            
-            # 显示报告内容
-            st.subheader("📊 分析报告")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown("### 📈 总体统计")
-                st.write(f"**处理文件数:** {report['total_files_processed']}")
-                st.write(f"**总记录数:** {report['total_records']:,}")
-                
-                if report['total_sales'] > 0:
-                    st.write(f"**总销售额:** {report['total_sales']:,.2f}")
-                    st.write(f"**平均订单金额:** {report['avg_order_value']:,.2f}")
-                
-                if report['date_range']:
-                    st.write(f"**数据时间范围:** {report['date_range']['start']} 至 {report['date_range']['end']}")
-            
-            with col2:
-                st.markdown("### 🏆 排行榜")
-                
-                if report['top_regions']:
-                    st.markdown("**销售额最高的地区:**")
-                    for i, (region, sales) in enumerate(list(report['top_regions'].items())[:5], 1):
-                        st.write(f"{i}. {region}: {sales:,.2f}")
-                
-                if report['top_products']:
-                    st.markdown("**销售额最高的产品:**")
-                    for i, (product, sales) in enumerate(list(report['top_products'].items())[:5], 1):
-                        st.write(f"{i}. {product}: {sales:,.2f}")
+    try:
+        # 生成报告：结果保存在会话中，导出按钮触发的重跑直接复用，不再重新汇总
+        if st.button("📄 生成分析报告", type="primary"):
+            st.session_state.report = st.session_state.processor.generate_combined_report()
+        
+        report = st.session_state.report
+        if report is None:
+            return
+        
+        # 显示报告内容
+        st.subheader("📊 分析报告")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("### 📈 总体统计")
+            st.write(f"**处理文件数:** {report['total_files_processed']}")
+            st.write(f"**总记录数:** {report['total_records']:,}")
             
-            # 文件分解统计
-            if report['file_breakdown']:
-                st.subheader("📁 文件分解统计")
-                file_breakdown_df = pd.DataFrame(report['file_breakdown']).T
-                st.dataframe(file_breakdown_df, use_container_width=True)
+            if report['total_sales'] > 0:
+                st.write(f"**总销售额:** {report['total_sales']:,.2f}")
+                st.write(f"**平均订单金额:** {report['avg_order_value']:,.2f}")
             
-            # 导出选项
-            st.subheader("💾 导出选项")
+            if report['date_range']:
+                st.write(f"**数据时间范围:** {report['date_range']['start']} 至 {report['date_range']['end']}")
+        
+        with col2:
+            st.markdown("### 🏆 排行榜")
             
-            col1, col2, col3 = st.columns(3)
+            if report['top_regions']:
+                st.markdown("**销售额最高的地区:**")
+                for i, (region, sales) in enumerate(list(report['top_regions'].items())[:5], 1):
+                    st.write(f"{i}. {region}: {sales:,.2f}")
             
-            with col1:
-                if st.button("📊 导出数据 (CSV)"):
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"sales_analysis_data_{timestamp}.csv"
-                    st.session_state.combined_data.to_csv(filename, index=False, encoding='utf-8-sig')
-                    st.success(f"数据已导出到: {filename}")
+            if report['top_products']:
+                st.markdown("**销售额最高的产品:**")
+                for i, (product, sales) in enumerate(list(report['top_products'].items())[:5], 1):
+                    st.write(f"{i}. {product}: {sales:,.2f}")
+        
+        # 文件分解统计
+        if report['file_breakdown']:
+            st.subheader("📁 文件分解统计")
+            file_breakdown_df = pd.DataFrame(report['file_breakdown']).T
+            st.dataframe(file_breakdown_df, use_container_width=True)
+        
+        # 导出选项
+        st.subheader("💾 导出选项")
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            if st.button("📊 导出数据 (CSV)"):
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"sales_analysis_data_{timestamp}.csv"
+                with st.spinner("正在导出CSV..."):
+                    write_csv(st.session_state.combined_data, filename)
+                st.success(f"数据已导出到: {filename}")
             
-            with col2:
-                if st.button("📋 导出报告 (TXT)"):
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"sales_analysis_report_{timestamp}.txt"
+            if st.button("🗜️ 导出数据 (Parquet)"):
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"sales_analysis_data_{timestamp}.parquet"
+                # 列式存储 + zstd 压缩，Product/Region 等重复字符串自动字典编码
+                st.session_state.combined_data.to_parquet(filename, index=False, compression='zstd')
+                st.success(f"数据已导出到: {filename}")
+        
+        with col2:
+            if st.button("📋 导出报告 (TXT)"):
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"sales_analysis_report_{timestamp}.txt"
+                
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write("销售数据分析报告\n")
+                    f.write("=" * 50 + "\n\n")
+                    f.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                    f.write(f"处理文件数: {report['total_files_processed']}\n")
+                    f.write(f"总记录数: {report['total_records']}\n")
                     
-                    with open(filename, 'w', encoding='utf-8') as f:
-                        f.write("销售数据分析报告\n")
-                        f.write("=" * 50 + "\n\n")
-                        f.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                        f.write(f"处理文件数: {report['total_files_processed']}\n")
-                        f.write(f"总记录数: {report['total_records']}\n")
-                        
-                        if report['total_sales'] > 0:
-                            f.write(f"总销售额: {report['total_sales']:,.2f}\n")
-                            f.write(f"平均订单金额: {report['avg_order_value']:,.2f}\n")
-                        
-                        f.write("\n地区销售排行:\n")
-                        for region, sales in report['top_regions'].items():
-                            f.write(f"- {region}: {sales:,.2f}\n")
-                        
-                        f.write("\n产品销售排行:\n")
-                        for product, sales in report['top_products'].items():
-                            f.write(f"- {product}: {sales:,.2f}\n")
+                    if report['total_sales'] > 0:
+                        f.write(f"总销售额: {report['total_sales']:,.2f}\n")
+                        f.write(f"平均订单金额: {report['avg_order_value']:,.2f}\n")
                     
-                    st.success(f"报告已导出到: {filename}")
-            
-            with col3:
-                if st.button("📈 导出图表数据"):
-                    # 这里可以添加图表数据的导出功能
-                    st.info("图表数据导出功能开发中...")
-            
-        except Exception as e:
-            st.error(f"生成报告时出错: {str(e)}")
+                    f.write("\n地区销售排行:\n")
+                    for region, sales in report['top_regions'].items():
+                        f.write(f"- {region}: {sales:,.2f}\n")
+                    
+                    f.write("\n产品销售排行:\n")
+                    for product, sales in report['top_products'].items():
+                        f.write(f"- {product}: {sales:,.2f}\n")
+                
+                st.success(f"报告已导出到: {filename}")
+        
+        with col3:
+            if st.button("📈 导出图表数据"):
+                # 这里可以添加图表数据的导出功能
+                st.info("图表数据导出功能开发中...")
+        
+    except Exception as e:
+        st.error(f"生成报告时出错: {str(e)}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
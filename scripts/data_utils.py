@@ -1,70 +1,53 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import random
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True  # 多线程CSV解析
+except ImportError:
+    HAS_PYARROW = False
 
 def create_sample_sales_data(n_records=1000):
     """
     创建符合项目要求的销售数据样本
+    每列由 NumPy 一次性向量化生成，不再逐行构建字典
     """
     # 设置随机种子以确保结果可重现
-    np.random.seed(42)
-    random.seed(42)
+    rng = np.random.default_rng(42)
     
     # 产品列表
-    products = [
+    products = np.array([
         "Laptop", "Smartphone", "Tablet", "Headphones", "Mouse", "Keyboard", 
         "Monitor", "Printer", "Camera", "Speaker", "Microphone", "Webcam",
         "USB Drive", "External HDD", "RAM", "SSD", "Graphics Card", "Motherboard",
         "Power Supply", "Cooling Fan"
-    ]
+    ])
     
     # 地区列表
-    regions = ["North", "South", "East", "West", "Central"]
+    regions = np.array(["North", "South", "East", "West", "Central"])
     
     # 生成数据
-    data = []
-    start_date = datetime(2023, 1, 1)
-    
-    for i in range(n_records):
+    df = pd.DataFrame({
         # 订单ID
-        order_id = i + 1
-        
+        'Order_ID': np.arange(1, n_records + 1, dtype=np.int32),
         # 产品名称
-        product = random.choice(products)
-        
+        'Product': rng.choice(products, n_records),
         # 购买数量 (1-50)
-        quantity = random.randint(1, 50)
-        
+        'Quantity': rng.integers(1, 51, n_records, dtype=np.int16),
         # 产品单价 (10-1000)
-        price = round(random.uniform(10, 1000), 2)
-        
-        # 订单日期
-        days_offset = random.randint(0, 365)
-        order_date = start_date + timedelta(days=days_offset)
-        
+        'Price': np.round(rng.uniform(10, 1000, n_records), 2),
+        # 订单日期 (2023-01-01 起 0-365 天)
+        'Order_Date': np.datetime64('2023-01-01') + rng.integers(0, 366, n_records).astype('timedelta64[D]'),
         # 销售地区
-        region = random.choice(regions)
-        
-        data.append({
-            'Order_ID': order_id,
-            'Product': product,
-            'Quantity': quantity,
-            'Price': price,
-            'Order_Date': order_date.strftime('%Y-%m-%d'),
-            'Region': region
-        })
-    
-    df = pd.DataFrame(data)
-    
-    # 添加一些缺失值
+        'Region': rng.choice(regions, n_records)
+    })
+    
+    # 添加一些缺失值（rng.choice 无放回抽取固定比例的行）
     # Price缺失值
-    price_missing_indices = random.sample(range(len(df)), int(len(df) * 0.1))
-    df.loc[price_missing_indices, 'Price'] = np.nan
+    df.loc[rng.choice(n_records, size=n_records // 10, replace=False), 'Price'] = np.nan
     
     # Region缺失值
-    region_missing_indices = random.sample(range(len(df)), int(len(df) * 0.05))
-    df.loc[region_missing_indices, 'Region'] = np.nan
+    df.loc[rng.choice(n_records, size=n_records // 20, replace=False), 'Region'] = np.nan
     
     return df
 
@@ -74,8 +57,8 @@ def load_and_check_data(file_path):
     """
     print("=== 数据加载与检查 ===")
     
-    # 读取数据
-    df = pd.read_csv(file_path)
+    # 读取数据（安装了 pyarrow 时多线程解析，Order_Date 在读取时直接解析为日期）
+    df = pd.read_csv(file_path, engine='pyarrow' if HAS_PYARROW else 'c', parse_dates=['Order_Date'])
     
     # 显示前3行
     print("\n1. 数据前3行:")
@@ -106,21 +89,32 @@ def clean_data(df):
     
     # 1. 处理Price缺失值 - 用中位数填充
     price_median = df['Price'].median()
-    df['Price'].fillna(price_median, inplace=True)
+    df['Price'] = df['Price'].fillna(price_median)
     print(f"Price列缺失值已用中位数 {price_median:.2f} 填充")
     
     # 2. 处理Region缺失值 - 用"Unknown"填充
-    df['Region'].fillna('Unknown', inplace=True)
+    df['Region'] = df['Region'].fillna('Unknown')
     print("Region列缺失值已用'Unknown'填充")
     
+    # Quantity 为小整数，降为最小的整数类型（含缺失值时保持不变），减少后续计算的内存带宽
+    df['Quantity'] = pd.to_numeric(df['Quantity'], downcast='integer')
+    
+    # Product/Region 为低基数字符串，转为 category 后分组、透视等操作基于整数编码
+    df['Product'] = df['Product'].astype('category')
+    df['Region'] = df['Region'].astype('category')
+    
     # 3. 删除完全重复的行
-    df.drop_duplicates(inplace=True)
+    df = df.drop_duplicates(ignore_index=True)
     print(f"删除重复行后行数: {len(df)}")
     
-    # 4. 将Order_Date列转换为日期格式
-    df['Order_Date'] = pd.to_datetime(df['Order_Date'])
+    # 4. 将Order_Date列转换为日期格式（已是datetime64时无需重复解析）
+    if not pd.api.types.is_datetime64_any_dtype(df['Order_Date']):
+        df['Order_Date'] = pd.to_datetime(df['Order_Date'])
     print("Order_Date列已转换为日期格式")
     
+    # 5. 按日期稳定排序一次（同日订单保持原顺序），后续按日期的分组/绘图可直接利用有序数据
+    df = df.sort_values('Order_Date', kind='stable', ignore_index=True)
+    
     return df
 
 def handle_outliers(df):
@@ -129,9 +123,9 @@ def handle_outliers(df):
     """
     print("\n=== 异常值处理 ===")
     
-    # 计算Quantity列的IQR
-    Q1 = df['Quantity'].quantile(0.25)
-    Q3 = df['Quantity'].quantile(0.75)
+    # 计算Quantity列的IQR（一次求出两个分位数）
+    q = df['Quantity'].to_numpy()
+    Q1, Q3 = np.nanquantile(q, [0.25, 0.75])
     IQR = Q3 - Q1
     upper_bound = Q3 + 1.5 * IQR
     
@@ -142,13 +136,15 @@ def handle_outliers(df):
     print(f"上界: {upper_bound}")
     
     # 统计异常值数量
-    outliers_before = len(df[df['Quantity'] > upper_bound])
+    outliers_before = int((q > upper_bound).sum())
     print(f"处理前异常值数量: {outliers_before}")
     
-    # 替换异常值
-    df.loc[df['Quantity'] > upper_bound, 'Quantity'] = upper_bound
+    # 替换异常值（np.clip 一次完成截断；有异常值时列随上界变为浮点）
+    if outliers_before:
+        q = np.clip(q, None, upper_bound)
+        df['Quantity'] = q
     
-    outliers_after = len(df[df['Quantity'] > upper_bound])
+    outliers_after = int((q > upper_bound).sum())
     print(f"处理后异常值数量: {outliers_after}")
     
     return df
@@ -165,14 +161,19 @@ def exploratory_analysis(df):
     print(df[numeric_cols].describe())
     
     # 2. 新增Sales列
-    df['Sales'] = df['Quantity'] * df['Price']
+    # pandas.eval 在安装 numexpr 时分块多线程计算，不产生中间数组
+    df.eval('Sales = Quantity * Price', inplace=True)
     print("\n2. 已新增Sales列 (Quantity × Price)")
     
     # 3. 按Region分组计算
     print("\n3. 按Region分组统计:")
-    grouped = df.groupby('Region').agg({
-        'Sales': ['sum', 'mean']
-    }).round(2)
+    if isinstance(df['Region'].dtype, pd.CategoricalDtype):
+        # category 列：直接用整数编码 np.bincount 一次得到各组的和与计数
+        grouped = _sum_mean_by_category(df['Region'], df['Sales']).round(2)
+    else:
+        grouped = df.groupby('Region', observed=True).agg({
+            'Sales': ['sum', 'mean']
+        }).round(2)
     
     # 重命名列为中英文对照
     grouped.columns = ['总销售额 (Total Sales)', '平均订单金额 (Avg Order Value)']
@@ -180,18 +181,53 @@ def exploratory_analysis(df):
     
     return df, grouped
 
+def _sum_mean_by_category(keys, values):
+    """
+    按 category 列分组计算 values 的和与均值（与 groupby(observed=True) 结果一致）
+    """
+    codes = keys.cat.codes.to_numpy()
+    values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    n = len(keys.cat.categories)
+    
+    # 缺失的分组键（编码 -1）与缺失值不参与计算
+    valid = (codes >= 0) & ~np.isnan(values)
+    sums = np.bincount(codes[valid], weights=values[valid], minlength=n)
+    counts = np.bincount(codes[valid], minlength=n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    
+    # 只保留数据中出现过的类别
+    observed = np.bincount(codes[codes >= 0], minlength=n) > 0
+    return pd.DataFrame({'sum': sums[observed], 'mean': means[observed]},
+                        index=pd.Index(keys.cat.categories[observed], name=keys.name))
+
+# CSV 流式写出时每批格式化的行数（与 Arrow 默认批大小一致）
+CSV_BATCH_ROWS = 65536
+
+def write_csv(df, path, index=False, bom=True):
+    """
+    以 UTF-8 BOM（Excel可识别）写出CSV，bom=False 时写出不带 BOM 的 UTF-8
+    每 CSV_BATCH_ROWS 行调用一次 to_csv 追加到同一文件，峰值内存不随数据量增长；
+    输出与 df.to_csv(path, index=index) 逐字节一致（不用 Arrow CSVWriter：
+    它会给所有字符串加引号，布尔值与浮点数的格式也与 to_csv 不同）
+    """
+    with open(path, 'w', encoding='utf-8-sig' if bom else 'utf-8', newline='') as f:
+        for start in range(0, max(len(df), 1), CSV_BATCH_ROWS):
+            df.iloc[start:start + CSV_BATCH_ROWS].to_csv(f, index=index, header=start == 0)
+    return path
+
 def save_results(df, grouped, output_dir):
     """
     保存结果
     """
     # 保存清洗后的数据
     cleaned_file = f"{output_dir}/cleaned_data.csv"
-    df.to_csv(cleaned_file, index=False, encoding='utf-8-sig')
+    write_csv(df, cleaned_file)
     print(f"\n清洗后的数据已保存到: {cleaned_file}")
     
     # 保存分组统计
     summary_file = f"{output_dir}/summary_stats.csv"
-    grouped.to_csv(summary_file, encoding='utf-8-sig')
+    write_csv(grouped, summary_file, index=True)
     print(f"分组统计已保存到: {summary_file}")
     
     return cleaned_file, summary_file 
\ No newline at end of file
@@ -3,7 +3,7 @@
 """
 多文件销售数据处理器
 
-支持批量处理多个CSV/XLSX文件的销售数据分析
+支持批量处理多个CSV/XLSX/Parquet文件的销售数据分析
 """
 
 import pandas as pd
@@ -12,19 +12,301 @@ import os
 import glob
 from datetime import datetime
 from pathlib import Path
+import codecs
+import contextlib
+import functools
+import hashlib
+import json
 import warnings
-warnings.filterwarnings('ignore')
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True  # 多线程CSV解析、清洗结果缓存
+except ImportError:
+    HAS_PYARROW = False
+
+from scripts.data_utils import write_csv
+
+try:
+    import polars as pl
+    HAS_POLARS = True  # 目录级惰性汇总（process_all_lazy）
+except ImportError:
+    HAS_POLARS = False
+
+try:
+    import python_calamine  # noqa: F401
+    HAS_CALAMINE = True  # Rust实现的XLSX解析
+except ImportError:
+    HAS_CALAMINE = False
+
+# CSV 候选编码（按优先级），latin-1 可解码任意字节，作为最后的兜底
+CSV_ENCODINGS = ['utf-8', 'gbk', 'latin-1']
+
+# 常见的列名映射（小写列名 -> 标准列名），模块级常量，每次调用无需重建
+COLUMN_NAME_MAP = {
+    # 订单ID相关
+    'order_id': 'Order_ID',
+    'orderid': 'Order_ID', 
+    'invoice': 'Order_ID',
+    'invoiceno': 'Order_ID',
+    'transaction_id': 'Order_ID',
+    
+    # 产品相关
+    'product': 'Product',
+    'product_name': 'Product',
+    'description': 'Product',
+    'stockcode': 'Product',
+    'item': 'Product',
+    
+    # 数量相关
+    'quantity': 'Quantity',
+    'qty': 'Quantity',
+    'amount': 'Quantity',
+    
+    # 价格相关
+    'price': 'Price',
+    'unit_price': 'Price',
+    'unitprice': 'Price',
+    'cost': 'Price',
+    
+    # 日期相关
+    'date': 'Order_Date',
+    'order_date': 'Order_Date',
+    'invoicedate': 'Order_Date',
+    'transaction_date': 'Order_Date',
+    
+    # 地区相关
+    'region': 'Region',
+    'country': 'Region',
+    'location': 'Region',
+    'area': 'Region',
+    
+    # 客户相关
+    'customer': 'Customer_ID',
+    'customer_id': 'Customer_ID',
+    'customerid': 'Customer_ID',
+}
+
+# 识别为销售数据所需的标准列
+SALES_COLUMNS = frozenset(['Order_ID', 'Product', 'Quantity', 'Price', 'Order_Date', 'Region'])
+
+# 销售数据清洗与统计规则（basic_data_cleaning/generate_file_summary 与 process_all_lazy 共用）
+REGION_FILL_VALUE = 'Unknown'  # Region 缺失值的填充值（Price 缺失值用中位数填充）
+IQR_MULTIPLIER = 1.5  # Quantity 截断上界 = Q3 + IQR_MULTIPLIER × IQR
+INVALID_PRODUCT_NAMES = ['', 'nan', 'None']  # 产品统计时视为缺失的产品名
+TOP_PRODUCT_COUNT = 10  # 每个文件摘要保留的热销产品数
+
+def _is_sales_data(columns):
+    """列集合中是否包含全部销售数据标准列"""
+    return SALES_COLUMNS.issubset(columns)
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_column_name(col):
+    """列名统一为去空白的小写形式（同名列在多个文件间重复出现，结果缓存复用）"""
+    return str(col).lower().strip()
+
+def _json_default(value):
+    """json.dumps 的兜底转换：NumPy 标量转为对应的 Python 数值"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"无法序列化为JSON: {type(value).__name__}")
+
+def _to_json_tree(value):
+    """字典编码为 {"__items__": [[键, 值], ...]}，JSON 读回后非字符串键（如数值产品编码）类型不变"""
+    if isinstance(value, dict):
+        return {'__items__': [[_to_json_tree(k), _to_json_tree(v)] for k, v in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [_to_json_tree(v) for v in value]
+    return value
+
+def _from_json_tree(value):
+    """还原 _to_json_tree 编码的结构（列表形式的键还原为元组）"""
+    if isinstance(value, dict):
+        return {tuple(k) if isinstance(k, list) else k: _from_json_tree(v)
+                for k, v in value['__items__']}
+    if isinstance(value, list):
+        return [_from_json_tree(v) for v in value]
+    return value
+
+def _dtypes_to_restore(df):
+    """Parquet 无法原样保存的列类型：datetime64[s]（以毫秒保存）与非字符串类别的 category
+    （读回为普通数值列），返回 {列位置: 类型描述}，JSON 序列化后存入缓存元数据"""
+    dtypes = {}
+    for i, dtype in enumerate(df.dtypes):
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            dtypes[i] = {'dtype': str(dtype)}
+        elif isinstance(dtype, pd.CategoricalDtype) and not pd.api.types.is_string_dtype(dtype.categories):
+            dtypes[i] = {'categories': dtype.categories.tolist(), 'ordered': bool(dtype.ordered)}
+    return dtypes
+
+def _cached_frame(table):
+    """处理结果缓存的 Arrow 表转为 DataFrame，并按元数据还原 _dtypes_to_restore 记录的列类型"""
+    df = table.to_pandas()
+    restore = json.loads((table.schema.metadata or {}).get(b'restore_dtypes', b'{}'))
+    for position, spec in restore.items():
+        column = df.iloc[:, int(position)]
+        if 'dtype' in spec:
+            column = column.astype(spec['dtype'])
+        else:
+            column = column.astype(pd.CategoricalDtype(spec['categories'], ordered=spec['ordered']))
+        df.isetitem(int(position), column)
+    return df
+
+def _collect_streaming(queries):
+    """以 Polars 流式引擎一起执行多个 LazyFrame（旧版 Polars 使用 streaming=True）"""
+    try:
+        return pl.collect_all(queries, engine='streaming')
+    except TypeError:
+        return pl.collect_all(queries, streaming=True)
+
+def _parse_dates(values):
+    """转换为日期类型：已是日期类型（如 pyarrow 读取时已解析）时直接返回，不再重复解析；
+    否则由 pandas 按首个有效值推断格式后整列按同一格式解析，无法解析的值记为 NaT"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, errors='coerce', cache=True)
+
+def _downcast_integers(df):
+    """int64 列降为能容纳其取值的最小整数类型；浮点列（金额等）保持 float64，避免精度损失"""
+    positions = np.flatnonzero(df.dtypes == np.int64)
+    if len(positions) == 0:
+        return df
+    # 按列位置替换，列名重复或非字符串时同样适用；写时复制下不影响原 DataFrame
+    df = df.copy(deep=False)
+    for i in positions:
+        df.isetitem(i, pd.to_numeric(df.iloc[:, i], downcast='integer'))
+    return df
+
+def _sum_file_stats(tables, columns=('总销售额', '订单数')):
+    """合并各文件摘要中的 {键: {统计项: 值}} 表，按键对指定统计项求和（按首次出现的顺序）"""
+    frames = [pd.DataFrame.from_dict(table, orient='index') for table in tables if table]
+    if not frames:
+        return pd.DataFrame(columns=list(columns))
+    combined = pd.concat(frames).reindex(columns=list(columns))
+    return combined.groupby(level=0, sort=False, dropna=False).sum()
+
+def _dedup_column_names(columns):
+    """为重复列名依次添加 _1、_2 ... 后缀（跳过已存在的名称）；
+    每个列名记录下一个可用序号，同名列很多时不必每次从 1 开始重新试探"""
+    names = list(columns)
+    seen = set()
+    next_suffix = {}
+    for i, col in enumerate(names):
+        if col in seen:
+            counter = next_suffix.get(col, 1)
+            while f"{col}_{counter}" in seen:
+                counter += 1
+            next_suffix[col] = counter + 1
+            names[i] = f"{col}_{counter}"
+        seen.add(names[i])
+    return names
+
+def _advise_sequential(file_path):
+    """提示内核该文件将被顺序读取，加大预读（仅支持 posix_fadvise 的系统，如 Linux）"""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+# 自动并行的文件总大小下限：小批量时每个子进程导入 pandas 的开销超过并行收益
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+
+# 图表默认分辨率（需要印刷质量时可传 dpi=300）
+CHART_DPI = 150
+# 后台排队等待绘制的图表任务上限，避免大量待绘制的数据同时驻留内存
+MAX_PENDING_CHARTS = 2
+
+# 处理结果（清洗后数据+文件摘要）缓存目录：默认为项目 outputs/.cache，与启动时的工作目录无关；
+# 显式传入 CACHE_BESIDE_INPUT 时改放在各输入文件所在目录的 CACHE_SUBDIR 子目录中
+# （scan_directory 扫描时跳过）。处理逻辑变化时提升版本号使旧缓存失效
+CACHE_DIR = str(Path(__file__).resolve().parent.parent / 'outputs' / '.cache')
+CACHE_BESIDE_INPUT = 'beside_input'
+CACHE_SUBDIR = '.sales_cache'
+CACHE_VERSION = 3
+
+@functools.lru_cache(maxsize=1)
+def _load_figure_class():
+    """首次生成图表时才导入 matplotlib 并配置中文字体，之后直接复用
+    
+    返回 matplotlib.figure.Figure：每张图是独立对象并由 Agg 渲染保存，
+    不经过 pyplot 的全局状态，可以在后台线程中绘制
+    """
+    import matplotlib
+    import matplotlib.font_manager as fm
+    from matplotlib.figure import Figure
+    
+    # 配置中文字体（字体列表只扫描一次）
+    try:
+        chinese_fonts = ['Microsoft YaHei', 'SimHei', 'SimSun', 'FangSong']
+        available_fonts = {f.name for f in fm.fontManager.ttflist}
+        
+        for font in chinese_fonts:
+            if font in available_fonts:
+                matplotlib.rcParams['font.sans-serif'] = [font]
+                matplotlib.rcParams['axes.unicode_minus'] = False
+                break
+        else:
+            matplotlib.rcParams['font.sans-serif'] = ['DejaVu Sans']
+            matplotlib.rcParams['axes.unicode_minus'] = False
+    except Exception as e:
+        print(f"       ├─ 字体配置警告: {e}")
+    
+    return Figure
+
+@contextlib.contextmanager
+def _ignore_missing_glyph_warnings():
+    """排版和保存图表期间屏蔽缺字警告（没有中文字体时每个汉字都会告警一次），
+    退出后恢复原有的警告过滤器，不影响进程中的其他代码"""
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message=r'Glyph \d+ .* missing from font', category=UserWarning)
+        yield
+
+def _process_file_worker(file_path, cache_dir=CACHE_DIR):
+    """子进程入口：用独立的处理器处理单个文件，返回 processed_files 中的记录
+    
+    子进程不生成图表：图表文件名固定，由主进程收集结果后按输入顺序依次生成。
+    清洗结果已写入 Parquet 缓存时，记录中只带缓存路径（cache_file），
+    由主进程内存映射读取，不再把整个 DataFrame pickle 后传回
+    """
+    processor = MultiFileProcessor(cache_dir=cache_dir)
+    processor.process_single_file(file_path, charts=False)
+    entry = processor.processed_files[Path(file_path).name]
+    if processor.cache_dir:
+        cache_file = processor._cache_path(file_path)
+        if os.path.exists(cache_file):
+            entry = {**entry, 'processed_data': None, 'cache_file': cache_file}
+    return entry
 
 class MultiFileProcessor:
     """多文件处理器类"""
     
-    def __init__(self):
+    def __init__(self, cache_dir=CACHE_DIR):
         self.processed_files = {}
         self.combined_data = None
+        # 合并用的目标列索引缓存：frozenset(文件名) -> (各文件列索引, 排序后的全部列名)
+        self._column_index_cache = {}
+        # 跨文件地区/产品汇总的缓存：(参与汇总的摘要列表, 地区汇总, 产品汇总)
+        self._cross_file_stats_cache = None
         self.file_summaries = {}
+        # 处理结果的 Parquet 缓存目录（默认 CACHE_DIR）；CACHE_BESIDE_INPUT 表示放在各输入文件
+        # 所在目录下的 CACHE_SUBDIR 中（需要数据目录可写）；None 表示不使用缓存
+        self.cache_dir = cache_dir if HAS_PYARROW else None
+        # 后台图表线程及尚未收集结果的任务 [(file_name, future)]
+        self._chart_executor = None
+        self._chart_jobs = []
         
     def scan_directory(self, directory_path="data"):
-        """扫描目录中的所有CSV和XLSX文件（包括子文件夹）"""
+        """扫描目录中的所有CSV、XLSX和Parquet文件（包括子文件夹）"""
         files = []
         directory = Path(directory_path)
         
@@ -33,15 +315,20 @@ class MultiFileProcessor:
         
         print(f"🔍 开始递归扫描目录: {directory_path}")
         
-        # 递归扫描CSV文件
-        csv_files = list(directory.rglob("*.csv"))
-        xlsx_files = list(directory.rglob("*.xlsx"))
+        # 递归扫描CSV文件（跳过处理结果缓存目录）
+        def rglob(pattern):
+            return [f for f in directory.rglob(pattern) if CACHE_SUBDIR not in f.relative_to(directory).parts]
+        
+        csv_files = rglob("*.csv")
+        xlsx_files = rglob("*.xlsx")
+        parquet_files = rglob("*.parquet")
         
         print(f"📁 发现 CSV 文件: {len(csv_files)} 个")
         print(f"📁 发现 XLSX 文件: {len(xlsx_files)} 个")
+        print(f"📁 发现 Parquet 文件: {len(parquet_files)} 个")
         
         # 合并所有文件
-        all_files = csv_files + xlsx_files
+        all_files = csv_files + xlsx_files + parquet_files
         
         # 打印文件路径信息
         for file_path in sorted(all_files):
@@ -60,11 +347,13 @@ class MultiFileProcessor:
             
             if file_path.suffix.lower() == '.csv':
                 print(f"      ├─ 文件类型: CSV")
-                # 尝试不同的编码
-                for encoding in ['utf-8', 'gbk', 'latin-1']:
+                _advise_sequential(file_path)
+                # 先按文件开头的样本推断编码，推断失败时再依次尝试其余编码
+                sniffed = self._sniff_encoding(file_path)
+                for encoding in [sniffed] + [enc for enc in CSV_ENCODINGS if enc != sniffed]:
                     try:
                         print(f"      ├─ 尝试编码: {encoding}")
-                        df = pd.read_csv(file_path, encoding=encoding)
+                        df = self._read_csv(file_path, encoding)
                         print(f"      ├─ 编码成功: {encoding}")
                         break
                     except UnicodeDecodeError as e:
@@ -75,7 +364,10 @@ class MultiFileProcessor:
                     
             elif file_path.suffix.lower() == '.xlsx':
                 print(f"      ├─ 文件类型: XLSX")
-                df = pd.read_excel(file_path)
+                df = pd.read_excel(file_path, engine='calamine' if HAS_CALAMINE else None)
+            elif file_path.suffix.lower() == '.parquet':
+                print(f"      ├─ 文件类型: Parquet")
+                df = pd.read_parquet(file_path)
             else:
                 raise Exception(f"不支持的文件格式: {file_path.suffix}")
             
@@ -89,99 +381,86 @@ class MultiFileProcessor:
             print(f"      └─ 文件加载失败: {str(e)}")
             raise Exception(f"加载文件失败 {file_path}: {str(e)}")
     
+    def _sniff_encoding(self, file_path, sample_size=64 * 1024):
+        """读取文件开头的样本，返回第一个能解码样本的候选编码
+        
+        只解码 64KB 样本，不必为每个候选编码重新解析整个文件
+        """
+        with open(file_path, 'rb') as f:
+            sample = f.read(sample_size)
+        for encoding in CSV_ENCODINGS:
+            try:
+                # 增量解码：样本末尾被截断的多字节字符不视为错误
+                codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        return CSV_ENCODINGS[-1]
+    
+    def _read_csv(self, file_path, encoding):
+        """读取CSV：优先使用 pyarrow 多线程引擎，解析失败时回退到 pandas C 引擎
+        
+        编码错误由 C 引擎以 UnicodeDecodeError 抛出，供调用方尝试下一个编码
+        """
+        if HAS_PYARROW:
+            try:
+                # strings_can_be_null：空字符串单元格读为缺失值，与 pandas C 引擎一致
+                # 内存映射读取，不经过 Python 文件对象的缓冲区复制
+                with pa.memory_map(str(file_path)) as source:
+                    table = pa_csv.read_csv(source, read_options=pa_csv.ReadOptions(encoding=encoding),
+                                            convert_options=pa_csv.ConvertOptions(strings_can_be_null=True))
+                # 非法UTF-8内容会被 pyarrow 读成二进制列，说明编码不对，交给 C 引擎判断
+                if not any(pa.types.is_binary(field.type) for field in table.schema):
+                    return table.to_pandas()
+            except Exception as e:
+                print(f"      ├─ pyarrow 引擎解析失败，改用默认引擎: {str(e)[:80]}")
+        return pd.read_csv(file_path, encoding=encoding, memory_map=True)
+    
     def standardize_columns(self, df, file_name):
         """标准化列名，尝试识别销售数据的关键列"""
         
-        # 常见的列名映射
-        column_mapping = {
-            # 订单ID相关
-            'order_id': 'Order_ID',
-            'orderid': 'Order_ID', 
-            'invoice': 'Order_ID',
-            'invoiceno': 'Order_ID',
-            'transaction_id': 'Order_ID',
-            
-            # 产品相关
-            'product': 'Product',
-            'product_name': 'Product',
-            'description': 'Product',
-            'stockcode': 'Product',
-            'item': 'Product',
-            
-            # 数量相关
-            'quantity': 'Quantity',
-            'qty': 'Quantity',
-            'amount': 'Quantity',
-            
-            # 价格相关
-            'price': 'Price',
-            'unit_price': 'Price',
-            'unitprice': 'Price',
-            'cost': 'Price',
-            
-            # 日期相关
-            'date': 'Order_Date',
-            'order_date': 'Order_Date',
-            'invoicedate': 'Order_Date',
-            'transaction_date': 'Order_Date',
-            
-            # 地区相关
-            'region': 'Region',
-            'country': 'Region',
-            'location': 'Region',
-            'area': 'Region',
-            
-            # 客户相关
-            'customer': 'Customer_ID',
-            'customer_id': 'Customer_ID',
-            'customerid': 'Customer_ID',
-        }
-        
         # 转换列名为小写进行映射
-        df_copy = df.copy()
-        original_columns = df_copy.columns.tolist()
-        
-        # 创建新的列名映射
-        new_columns = {}
-        for col in original_columns:
-            col_lower = col.lower().strip()
-            if col_lower in column_mapping:
-                new_columns[col] = column_mapping[col_lower]
-            else:
-                new_columns[col] = col
-                
-        df_copy.rename(columns=new_columns, inplace=True)
+        new_columns = {col: COLUMN_NAME_MAP.get(_normalize_column_name(col), col) for col in df.columns}
+        
+        # rename 返回新对象，列数据在写时复制下与原数据共享，不再整表深拷贝
+        df_copy = df.rename(columns=new_columns)
         
-        # 添加文件来源标识
-        df_copy['Source_File'] = file_name
+        # 添加文件来源标识（单一类别的 category 列，每行只占 1 字节编码）
+        df_copy['Source_File'] = pd.Categorical.from_codes(np.zeros(len(df_copy), dtype=np.int8),
+                                                           categories=[file_name])
         
         return df_copy, new_columns
     
     def basic_data_cleaning(self, df):
         """基础数据清洗 - 按照项目需求实现完整的数据清洗流程"""
-        df_clean = df.copy()
+        # 浅拷贝：下面都是整列替换/删除行，不会改动传入的数据，无需先深拷贝整表
+        df_clean = df.copy(deep=False)
         print(f"    ├─ 开始数据清洗...")
         print(f"       ├─ 清洗前行数: {len(df_clean)}")
         
         # 检查是否为销售数据
-        required_cols = ['Order_ID', 'Product', 'Quantity', 'Price', 'Order_Date', 'Region']
-        has_sales_data = all(col in df_clean.columns for col in required_cols)
-        
-        if has_sales_data:
+        if _is_sales_data(df_clean.columns):
             print(f"       ├─ 识别为销售数据，执行完整清洗流程")
             
-            # 1. 处理Price缺失值 - 用中位数填充
-            price_missing_before = df_clean['Price'].isnull().sum()
-            if price_missing_before > 0:
+            # 1/2. 缺失值处理：Price用中位数、Region用"Unknown"，收集后一次 fillna 完成
+            missing_before = df_clean[['Price', 'Region']].isnull().sum()
+            fill_values = {}
+            if missing_before['Price'] > 0:
                 price_median = df_clean['Price'].median()
-                df_clean['Price'].fillna(price_median, inplace=True)
-                print(f"       ├─ Price列缺失值: {price_missing_before} -> 0 (用中位数 {price_median:.2f} 填充)")
+                fill_values['Price'] = price_median
+                print(f"       ├─ Price列缺失值: {missing_before['Price']} -> 0 (用中位数 {price_median:.2f} 填充)")
+            
+            if missing_before['Region'] > 0:
+                fill_values['Region'] = REGION_FILL_VALUE
+                print(f"       ├─ Region列缺失值: {missing_before['Region']} -> 0 (用'{REGION_FILL_VALUE}'填充)")
             
-            # 2. 处理Region缺失值 - 用"Unknown"填充
-            region_missing_before = df_clean['Region'].isnull().sum()
-            if region_missing_before > 0:
-                df_clean['Region'].fillna('Unknown', inplace=True)
-                print(f"       ├─ Region列缺失值: {region_missing_before} -> 0 (用'Unknown'填充)")
+            if fill_values:
+                # category 列（如 Parquet 读回的生成数据）需先把填充值加入类别表，否则 fillna 会报错
+                for col, value in fill_values.items():
+                    column = df_clean[col]
+                    if isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories:
+                        df_clean[col] = column.cat.add_categories([value])
+                df_clean = df_clean.fillna(fill_values)
             
             # 3. 删除完全重复的行
             rows_before = len(df_clean)
@@ -191,31 +470,35 @@ class MultiFileProcessor:
             
             # 4. 处理日期列
             try:
-                df_clean['Order_Date'] = pd.to_datetime(df_clean['Order_Date'], errors='coerce')
+                df_clean['Order_Date'] = _parse_dates(df_clean['Order_Date'])
                 print(f"       ├─ Order_Date列已转换为日期格式")
             except Exception as e:
                 print(f"       ├─ 日期转换警告: {e}")
             
             # 5. 异常值处理 - IQR方法处理Quantity列
-            Q1 = df_clean['Quantity'].quantile(0.25)
-            Q3 = df_clean['Quantity'].quantile(0.75)
+            # 取出一份 float64 数组，截断与下面的 Sales 计算都在这份数组上完成
+            q = df_clean['Quantity'].to_numpy(dtype=np.float64, copy=True)
+            Q1, Q3 = np.nanquantile(q, [0.25, 0.75])
             IQR = Q3 - Q1
-            upper_bound = Q3 + 1.5 * IQR
+            upper_bound = Q3 + IQR_MULTIPLIER * IQR
             
-            outliers_before = len(df_clean[df_clean['Quantity'] > upper_bound])
-            df_clean.loc[df_clean['Quantity'] > upper_bound, 'Quantity'] = upper_bound
-            outliers_after = len(df_clean[df_clean['Quantity'] > upper_bound])
+            outliers_before = int((q > upper_bound).sum())
+            if outliers_before:
+                np.minimum(q, upper_bound, out=q)
+                df_clean['Quantity'] = q
+            outliers_after = int((q > upper_bound).sum())
             print(f"       ├─ Quantity异常值处理: {outliers_before} -> {outliers_after} (上界: {upper_bound:.2f})")
             
-            # 6. 创建Sales列
-            df_clean['Sales'] = df_clean['Quantity'] * df_clean['Price']
+            # 6. 创建Sales列：直接用截断后的数组相乘，不再经 pandas 重新读取两列
+            df_clean['Sales'] = np.multiply(q, df_clean['Price'].to_numpy(dtype=np.float64))
             print(f"       ├─ 已创建Sales列 (Quantity × Price)")
             
-            # 7. 确保数值类型正确
-            numeric_columns = ['Quantity', 'Price', 'Sales']
-            for col in numeric_columns:
+            # 7. 压缩数据类型：低基数字符串列转为 category，Quantity 降为最小整数类型
+            # （Quantity/Price 能参与上面的计算说明已是数值类型，无需再次 to_numeric）
+            for col in ['Region', 'Product', 'Source_File']:
                 if col in df_clean.columns:
-                    df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
+                    df_clean[col] = df_clean[col].astype('category')
+            df_clean['Quantity'] = pd.to_numeric(df_clean['Quantity'], downcast='integer')
         else:
             print(f"       ├─ 非销售数据，执行基础清洗")
             # 基础清洗逻辑
@@ -224,7 +507,7 @@ class MultiFileProcessor:
             for col in date_columns:
                 if col in df_clean.columns:
                     try:
-                        df_clean[col] = pd.to_datetime(df_clean[col], errors='coerce')
+                        df_clean[col] = _parse_dates(df_clean[col])
                     except:
                         pass
             
@@ -237,65 +520,67 @@ class MultiFileProcessor:
         print(f"       └─ 数据清洗完成，最终行数: {len(df_clean)}")
         return df_clean
     
-    def process_single_file(self, file_path):
-        """处理单个文件"""
+    def process_single_file(self, file_path, charts=True):
+        """处理单个文件
+        
+        charts=False 时不生成图表（由调用方稍后按顺序调用 _submit_sales_visualization）
+        """
         try:
             print(f"    ┌─ 开始处理单个文件: {Path(file_path).name}")
-            
-            # 加载文件
-            print(f"    ├─ 正在加载文件...")
-            df = self.load_file(file_path)
             file_name = Path(file_path).name
-            print(f"    ├─ 文件加载完成，原始数据: {len(df)} 行 x {len(df.columns)} 列")
             
-            # 标准化列名
-            print(f"    ├─ 正在标准化列名...")
-            df_std, column_mapping = self.standardize_columns(df, file_name)
-            mapped_columns = [k for k, v in column_mapping.items() if k != v]
-            if mapped_columns:
-                print(f"    ├─ 已映射列名: {len(mapped_columns)} 个")
+            # 文件未变化时直接读取上次的处理结果
+            cached = self._load_cached_result(file_path)
+            if cached is not None:
+                df_clean, column_mapping, summary = cached
+                print(f"    ├─ 命中处理缓存，跳过加载、清洗与摘要: {len(df_clean)} 行 x {len(df_clean.columns)} 列")
             else:
-                print(f"    ├─ 无需映射列名")
-            
-            # 基础清洗
-            print(f"    ├─ 正在进行数据清洗...")
-            df_clean = self.basic_data_cleaning(df_std)
-            
-            # 检查是否为销售数据并生成可视化
-            required_cols = ['Order_ID', 'Product', 'Quantity', 'Price', 'Order_Date', 'Region']
-            has_sales_data = all(col in df_clean.columns for col in required_cols)
-            
-            visualization_files = []
-            if has_sales_data and 'Sales' in df_clean.columns:
-                print(f"    ├─ 检测到销售数据，生成可视化图表...")
-                visualization_files = self.generate_sales_visualization(df_clean)
-            
-            # 检查Sales列
-            if 'Sales' in df_clean.columns:
-                sales_count = df_clean['Sales'].notna().sum()
-                total_sales = df_clean['Sales'].sum()
-                print(f"    ├─ 销售数据: {sales_count} 条有效记录，总额: {total_sales:,.2f}")
-            else:
-                print(f"    ├─ 未找到销售数据列")
-            
-            # 生成文件摘要
-            print(f"    ├─ 正在生成文件摘要...")
-            summary = self.generate_file_summary(df_clean, file_name)
-            
-            # 添加可视化文件信息到摘要
-            if visualization_files:
-                summary['visualization_files'] = visualization_files
+                # 加载文件
+                print(f"    ├─ 正在加载文件...")
+                df = self.load_file(file_path)
+                print(f"    ├─ 文件加载完成，原始数据: {len(df)} 行 x {len(df.columns)} 列")
+                
+                # 标准化列名
+                print(f"    ├─ 正在标准化列名...")
+                df_std, column_mapping = self.standardize_columns(df, file_name)
+                mapped_columns = [k for k, v in column_mapping.items() if k != v]
+                if mapped_columns:
+                    print(f"    ├─ 已映射列名: {len(mapped_columns)} 个")
+                else:
+                    print(f"    ├─ 无需映射列名")
+                
+                # 基础清洗
+                print(f"    ├─ 正在进行数据清洗...")
+                df_clean = self.basic_data_cleaning(df_std)
+                
+                # 原始数据此后不再使用，及时释放，只保留清洗后的数据
+                del df, df_std
+                
+                # 检查Sales列
+                if 'Sales' in df_clean.columns:
+                    sales_count = df_clean['Sales'].notna().sum()
+                    total_sales = df_clean['Sales'].sum()
+                    print(f"    ├─ 销售数据: {sales_count} 条有效记录，总额: {total_sales:,.2f}")
+                else:
+                    print(f"    ├─ 未找到销售数据列")
+                
+                # 生成文件摘要
+                print(f"    ├─ 正在生成文件摘要...")
+                summary = self.generate_file_summary(df_clean, file_name)
+                self._save_cached_result(file_path, df_clean, column_mapping, summary)
             
-            # 存储处理结果
+            # 存储处理结果（不保留原始数据，每个文件只占一份清洗后数据的内存）
             self.processed_files[file_name] = {
-                'original_data': df,
                 'processed_data': df_clean,
                 'column_mapping': column_mapping,
                 'summary': summary,
                 'file_path': file_path,
-                'visualization_files': visualization_files
+                'visualization_files': []
             }
             
+            if charts and self._submit_file_charts(file_name):
+                print(f"    ├─ 检测到销售数据，已提交后台生成可视化图表")
+            
             print(f"    └─ 单个文件处理完成")
             
             return df_clean, summary
@@ -304,6 +589,119 @@ class MultiFileProcessor:
             print(f"    └─ 单个文件处理失败: {str(e)}")
             raise Exception(f"处理文件失败 {file_path}: {str(e)}")
     
+    def _cache_path(self, file_path):
+        """缓存文件路径：<绝对路径哈希>-<修改时间、大小与缓存版本的哈希>.parquet
+        
+        同一输入文件的各版本缓存共用前缀，写入新缓存时据此清理旧版本
+        """
+        abs_path = os.path.abspath(file_path)
+        if self.cache_dir == CACHE_BESIDE_INPUT:
+            cache_dir = os.path.join(os.path.dirname(abs_path), CACHE_SUBDIR)
+        else:
+            cache_dir = self.cache_dir
+        stat = os.stat(file_path)
+        path_key = hashlib.sha1(abs_path.encode('utf-8')).hexdigest()
+        version_key = hashlib.sha1(f"{stat.st_mtime_ns}|{stat.st_size}|{CACHE_VERSION}".encode('utf-8')).hexdigest()
+        return os.path.join(cache_dir, f"{path_key}-{version_key[:16]}.parquet")
+    
+    def _prune_cache(self, cache_file):
+        """删除与 cache_file 同一输入文件的旧版本缓存（文件已修改或缓存版本已提升）"""
+        cache_dir, current = os.path.split(cache_file)
+        prefix = current.split('-', 1)[0] + '-'
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and name.endswith('.parquet') and name != current:
+                try:
+                    os.remove(os.path.join(cache_dir, name))
+                except OSError:
+                    pass
+    
+    def _load_cached_result(self, file_path):
+        """读取处理结果缓存，返回 (df_clean, column_mapping, summary)，未命中时返回 None"""
+        if not self.cache_dir:
+            return None
+        try:
+            cache_file = self._cache_path(file_path)
+            if not os.path.exists(cache_file):
+                return None
+            table = pq.read_table(cache_file)
+            column_mapping = _from_json_tree(json.loads(table.schema.metadata[b'column_mapping']))
+            summary = _from_json_tree(json.loads(table.schema.metadata[b'summary']))
+            df_clean = _cached_frame(table)
+            # dtype 对象不能存为 JSON，按读回的数据重新生成
+            summary['data_types'] = df_clean.dtypes.to_dict()
+            return df_clean, column_mapping, summary
+        except Exception as e:
+            # 缓存损坏或不可读时按未命中处理
+            print(f"    ├─ 处理缓存读取失败，重新处理: {e}")
+            return None
+    
+    def _save_cached_result(self, file_path, df_clean, column_mapping, summary):
+        """将清洗结果写为 zstd 压缩的 Parquet（category 列按字典编码存储），
+        列名映射与文件摘要以 JSON 存入 Parquet 元数据"""
+        if not self.cache_dir:
+            return
+        try:
+            cache_file = self._cache_path(file_path)
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            table = pa.Table.from_pandas(df_clean, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[b'column_mapping'] = json.dumps(_to_json_tree(column_mapping), ensure_ascii=False,
+                                                     default=_json_default).encode('utf-8')
+            # dtype 对象不能存为 JSON：只保留占位（保持键的顺序），读取时按数据重新生成
+            summary = {k: None if k == 'data_types' else v for k, v in summary.items()}
+            metadata[b'summary'] = json.dumps(_to_json_tree(summary), ensure_ascii=False,
+                                              default=_json_default).encode('utf-8')
+            metadata[b'restore_dtypes'] = json.dumps(_dtypes_to_restore(df_clean),
+                                                     default=_json_default).encode('utf-8')
+            table = table.replace_schema_metadata(metadata)
+            
+            # 先写临时文件再原子替换，并行处理时不会读到写了一半的缓存
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            pq.write_table(table, tmp_file, compression='zstd', compression_level=3,
+                           row_group_size=128_000)
+            os.replace(tmp_file, cache_file)
+            self._prune_cache(cache_file)
+        except Exception as e:
+            print(f"    ├─ 处理缓存写入失败（不影响处理结果）: {e}")
+    
+    def _valid_products(self, products):
+        """产品列转为 category 后直接从类别表中去掉空字符串和"nan"/"None"（对应行变为缺失），
+        只处理类别而无需把整列转成字符串再逐个比较"""
+        if not isinstance(products.dtype, pd.CategoricalDtype):
+            products = products.astype('category')
+        invalid = products.cat.categories.intersection(INVALID_PRODUCT_NAMES)
+        if len(invalid) > 0:
+            products = products.cat.remove_categories(invalid)
+        return products
+    
+    def _top_products(self, products, sales, n=TOP_PRODUCT_COUNT):
+        """按产品类别编码用 np.bincount 一次求出各产品的销售额与订单数，
+        再用 np.argpartition 只对前 n 名排序，不对全部产品分组排序
+        
+        返回 (前 n 个产品的统计表, 出现过的产品数)，统计表与
+        groupby(observed=True).agg(sum, count).round(2).nlargest(n) 一致
+        """
+        codes = products.cat.codes.to_numpy()
+        values = sales.to_numpy(dtype=np.float64, na_value=np.nan)
+        k = len(products.cat.categories)
+        
+        # 缺失的产品（编码 -1）不参与统计；缺失的销售额不计入求和与计数
+        has_key = codes >= 0
+        valid = has_key & ~np.isnan(values)
+        sums = np.round(np.bincount(codes[valid], weights=values[valid], minlength=k), 2)
+        counts = np.bincount(codes[valid], minlength=k)
+        
+        # 只在数据中出现过的产品里取前 n 名（同额时按类别顺序）
+        observed = np.flatnonzero(np.bincount(codes[has_key], minlength=k))
+        product_count = len(observed)
+        if product_count > n:
+            observed = observed[np.argpartition(-sums[observed], n - 1)[:n]]
+        top = observed[np.lexsort((observed, -sums[observed]))]
+        
+        top_products = pd.DataFrame({'总销售额': sums[top], '订单数': counts[top]},
+                                    index=pd.Index(products.cat.categories[top], name=products.name))
+        return top_products, product_count
+    
     def generate_file_summary(self, df, file_name):
         """生成文件摘要统计 - 增强销售数据分析"""
         summary = {
@@ -316,8 +714,7 @@ class MultiFileProcessor:
         }
         
         # 检查是否为销售数据
-        required_cols = ['Order_ID', 'Product', 'Quantity', 'Price', 'Order_Date', 'Region']
-        has_sales_data = all(col in df.columns for col in required_cols)
+        has_sales_data = _is_sales_data(df.columns)
         summary['is_sales_data'] = has_sales_data
         
         if has_sales_data:
@@ -325,72 +722,47 @@ class MultiFileProcessor:
             
             # 销售额统计
             if 'Sales' in df.columns:
-                summary['total_sales'] = float(df['Sales'].sum())
-                summary['avg_sales'] = float(df['Sales'].mean())
-                summary['median_sales'] = float(df['Sales'].median())
-                summary['max_sales'] = float(df['Sales'].max())
-                summary['min_sales'] = float(df['Sales'].min())
+                # 只取一次去掉缺失值的 float64 数组，各统计量都在这份数组上计算
+                sales = df['Sales'].to_numpy(dtype=np.float64, na_value=np.nan)
+                sales = sales[~np.isnan(sales)]
+                total_sales = float(sales.sum())
+                summary['total_sales'] = total_sales
+                if len(sales):
+                    summary['avg_sales'] = total_sales / len(sales)
+                    summary['median_sales'] = float(np.median(sales))
+                    summary['max_sales'] = float(sales.max())
+                    summary['min_sales'] = float(sales.min())
+                else:
+                    summary['avg_sales'] = summary['median_sales'] = np.nan
+                    summary['max_sales'] = summary['min_sales'] = np.nan
                 print(f"       ├─ 总销售额: {summary['total_sales']:,.2f}")
                 print(f"       ├─ 平均销售额: {summary['avg_sales']:,.2f}")
             
-            # 地区统计
-            if 'Region' in df.columns:
-                region_stats = df.groupby('Region').agg({
-                    'Sales': ['sum', 'count', 'mean'] if 'Sales' in df.columns else 'count'
-                }).round(2)
-                
-                if 'Sales' in df.columns:
-                    region_stats.columns = ['总销售额', '订单数', '平均订单金额']
-                    summary['region_analysis'] = region_stats.to_dict('index')
-                    print(f"       ├─ 地区分析完成，共 {len(region_stats)} 个地区")
+            # 地区统计（单次命名聚合；category 列按整数编码分组，只保留出现过的地区）
+            if 'Region' in df.columns and 'Sales' in df.columns:
+                region_stats = df.groupby('Region', observed=True).agg(
+                    总销售额=('Sales', 'sum'),
+                    订单数=('Sales', 'count'),
+                    平均订单金额=('Sales', 'mean')
+                ).round(2)
+                summary['region_analysis'] = region_stats.to_dict('index')
+                print(f"       ├─ 地区分析完成，共 {len(region_stats)} 个地区")
                 
             # 产品统计 - 增强错误处理
             if 'Product' in df.columns:
                 try:
-                    # 检查Product列是否有效数据
-                    valid_products = df['Product'].notna()
-                    if valid_products.sum() > 0:
-                        # 清理Product列数据
-                        df_clean_products = df[valid_products].copy()
-                        
-                        # 确保Product列是字符串类型
-                        df_clean_products['Product'] = df_clean_products['Product'].astype(str)
-                        
-                        # 移除空字符串和"nan"字符串 - 修复布尔判断错误
-                        # 分步进行条件筛选以避免Series布尔判断错误
-                        mask1 = df_clean_products['Product'] != ''
-                        mask2 = df_clean_products['Product'] != 'nan'
-                        mask3 = df_clean_products['Product'] != 'None'
-                        
-                        # 组合所有条件
-                        combined_mask = mask1 & mask2 & mask3
-                        df_clean_products = df_clean_products[combined_mask]
-                        
-                        if len(df_clean_products) > 0:
-                            # 重置索引以避免groupby问题
-                            df_clean_products = df_clean_products.reset_index(drop=True)
-                            
-                            # 进行产品分组统计
-                            if 'Sales' in df.columns:
-                                product_stats = df_clean_products.groupby('Product', as_index=False).agg({
-                                    'Sales': ['sum', 'count']
-                                }).round(2)
-                                
-                                # 重新命名列
-                                product_stats.columns = ['Product', '总销售额', '订单数']
-                                product_stats = product_stats.set_index('Product')
-                                
-                                # 只保存前10个产品
-                                top_products = product_stats.sort_values('总销售额', ascending=False).head(10)
-                                summary['top_products'] = top_products.to_dict('index')
-                                print(f"       ├─ 产品分析完成，共 {len(product_stats)} 个产品")
-                            else:
-                                product_count = df_clean_products.groupby('Product', as_index=False).size()
-                                print(f"       ├─ 产品分析完成，共 {len(product_count)} 个产品（无销售数据）")
-                        else:
-                            print(f"       ├─ 产品列清理后无有效数据，跳过产品分析")
+                    products = self._valid_products(df['Product'])
+                    
+                    if products.count() == 0:
+                        print(f"       ├─ 产品列清理后无有效数据，跳过产品分析")
+                    elif 'Sales' in df.columns:
+                        # 进行产品分组统计，只保存前10个产品
+                        top_products, product_count = self._top_products(products, df['Sales'])
+                        summary['top_products'] = top_products.to_dict('index')
+                        print(f"       ├─ 产品分析完成，共 {product_count} 个产品")
                     else:
-                        print(f"       ├─ 产品列为空，跳过产品分析")
+                        product_count = products.nunique()
+                        print(f"       ├─ 产品分析完成，共 {product_count} 个产品（无销售数据）")
                         
                 except Exception as e:
                     print(f"       ├─ 产品分析错误: {str(e)}")
@@ -400,12 +772,13 @@ class MultiFileProcessor:
             # 时间维度分析
             if 'Order_Date' in df.columns:
                 try:
-                    date_col = pd.to_datetime(df['Order_Date'], errors='coerce')
-                    valid_dates = date_col.dropna()
-                    if len(valid_dates) > 0:
+                    # 清洗阶段已解析为日期，这里直接复用；min/max 自动跳过 NaT
+                    date_col = _parse_dates(df['Order_Date'])
+                    start, end = date_col.min(), date_col.max()
+                    if pd.notna(start):
                         summary['date_range'] = {
-                            'start': valid_dates.min().strftime('%Y-%m-%d'),
-                            'end': valid_dates.max().strftime('%Y-%m-%d')
+                            'start': start.strftime('%Y-%m-%d'),
+                            'end': end.strftime('%Y-%m-%d')
                         }
                         print(f"       ├─ 日期范围: {summary['date_range']['start']} ~ {summary['date_range']['end']}")
                 except Exception as e:
@@ -419,11 +792,64 @@ class MultiFileProcessor:
         
         return summary
     
-    def generate_sales_visualization(self, df, output_dir="outputs"):
-        """生成销售数据可视化图表"""
-        import matplotlib.pyplot as plt
-        import matplotlib.font_manager as fm
-        
+    def _submit_file_charts(self, file_name):
+        """为 processed_files 中的一个销售数据文件提交图表任务，返回是否提交
+        
+        先清空该文件记录中的图表路径，路径只由本进程为该文件生成的图表写回
+        """
+        entry = self.processed_files[file_name]
+        df, summary = entry['processed_data'], entry['summary']
+        entry['visualization_files'] = []
+        summary.pop('visualization_files', None)
+        if not (summary['is_sales_data'] and 'Sales' in df.columns):
+            return False
+        self._submit_sales_visualization(df, file_name, summary)
+        return True
+    
+    def _submit_sales_visualization(self, df, file_name, summary):
+        """在后台线程生成图表，不阻塞后续文件的处理
+        
+        地区统计与前10产品直接取自文件摘要，图表不再重复分组计算
+        """
+        region_stats = top_products = None
+        if 'region_analysis' in summary:
+            region_stats = pd.DataFrame.from_dict(summary['region_analysis'], orient='index')
+        if 'top_products' in summary:
+            top_products = pd.DataFrame.from_dict(summary['top_products'], orient='index')
+        
+        if self._chart_executor is None:
+            # 单个线程：图表文件名固定，按提交顺序依次写出
+            self._chart_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='charts')
+        
+        # 排队任务达到上限时先等待最早的任务完成
+        while len(self._chart_jobs) >= MAX_PENDING_CHARTS:
+            self._collect_chart_job(*self._chart_jobs.pop(0))
+        
+        future = self._chart_executor.submit(self.generate_sales_visualization, df,
+                                             region_stats=region_stats, top_products=top_products)
+        self._chart_jobs.append((file_name, future))
+    
+    def _collect_chart_job(self, file_name, future):
+        """取回一个后台图表任务的结果，写回该文件的处理记录与摘要"""
+        visualization_files = future.result()
+        entry = self.processed_files.get(file_name)
+        if entry is not None and visualization_files:
+            entry['visualization_files'] = visualization_files
+            entry['summary']['visualization_files'] = visualization_files
+    
+    def wait_for_charts(self):
+        """等待所有后台图表生成完成"""
+        while self._chart_jobs:
+            self._collect_chart_job(*self._chart_jobs.pop(0))
+    
+    def generate_sales_visualization(self, df, output_dir="outputs", dpi=CHART_DPI,
+                                     region_stats=None, top_products=None):
+        """生成销售数据可视化图表
+        
+        region_stats（各地区 总销售额/订单数）与 top_products（前10产品 总销售额）
+        可由 generate_file_summary 的结果传入；未传入时在这里各计算一次，
+        柱状图与散点图共用同一份地区统计
+        """
         # 检查是否为销售数据
         required_cols = ['Region', 'Sales']
         if not all(col in df.columns for col in required_cols):
@@ -432,21 +858,8 @@ class MultiFileProcessor:
         
         print(f"    ├─ 开始生成销售数据可视化图表...")
         
-        # 配置中文字体
-        try:
-            chinese_fonts = ['Microsoft YaHei', 'SimHei', 'SimSun', 'FangSong']
-            available_fonts = [f.name for f in fm.fontManager.ttflist]
-            
-            for font in chinese_fonts:
-                if font in available_fonts:
-                    plt.rcParams['font.sans-serif'] = [font]
-                    plt.rcParams['axes.unicode_minus'] = False
-                    break
-            else:
-                plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
-                plt.rcParams['axes.unicode_minus'] = False
-        except Exception as e:
-            print(f"       ├─ 字体配置警告: {e}")
+        # matplotlib 与中文字体只在首次调用时加载配置
+        Figure = _load_figure_class()
         
         # 确保输出目录存在
         import os
@@ -456,39 +869,50 @@ class MultiFileProcessor:
         
         try:
             # 1. 各地区总销售额柱状图
-            plt.figure(figsize=(12, 8))
-            region_sales = df.groupby('Region')['Sales'].sum().sort_values(ascending=False)
+            fig = Figure(figsize=(12, 8))
+            ax = fig.subplots()
+            if region_stats is None:
+                region_stats = df.groupby('Region', observed=True).agg(
+                    总销售额=('Sales', 'sum'),
+                    订单数=('Sales', 'count')
+                )
+            region_sales = region_stats['总销售额'].sort_values(ascending=False)
+            region_names = region_sales.index.astype(str)
             
-            bars = plt.bar(region_sales.index, region_sales.values, 
+            bars = ax.bar(region_names, region_sales.values, 
                           color=['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD'],
                           alpha=0.8, edgecolor='black', linewidth=1)
             
-            plt.title('各地区总销售额 (Total Sales by Region)', fontsize=16, fontweight='bold', pad=20)
-            plt.xlabel('地区 (Region)', fontsize=12, fontweight='bold')
-            plt.ylabel('总销售额 (Total Sales)', fontsize=12, fontweight='bold')
-            plt.xticks(rotation=45, ha='right')
-            plt.grid(True, alpha=0.3, axis='y')
+            ax.set_title('各地区总销售额 (Total Sales by Region)', fontsize=16, fontweight='bold', pad=20)
+            ax.set_xlabel('地区 (Region)', fontsize=12, fontweight='bold')
+            ax.set_ylabel('总销售额 (Total Sales)', fontsize=12, fontweight='bold')
+            ax.tick_params(axis='x', labelrotation=45)
+            for label in ax.get_xticklabels():
+                label.set_horizontalalignment('right')
+            ax.grid(True, alpha=0.3, axis='y')
             
             # 添加数值标签
             for i, (region, value) in enumerate(region_sales.items()):
-                plt.text(i, value + max(region_sales.values) * 0.01, 
+                ax.text(i, value + max(region_sales.values) * 0.01, 
                         f'{value:,.0f}', ha='center', va='bottom', 
                         fontweight='bold', fontsize=10)
             
-            plt.tight_layout()
+            # 已 tight_layout 排版，保存时不再用 bbox_inches='tight' 重复渲染一遍
             chart_file = f"{output_dir}/sales_by_region.png"
-            plt.savefig(chart_file, dpi=300, bbox_inches='tight', facecolor='white')
-            plt.close()
+            with _ignore_missing_glyph_warnings():
+                fig.tight_layout()
+                fig.savefig(chart_file, dpi=dpi, facecolor='white')
             generated_files.append(chart_file)
             print(f"       ├─ 生成柱状图: {chart_file}")
             
             # 2. 综合分析图表
-            fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+            fig = Figure(figsize=(16, 12))
+            axes = fig.subplots(2, 2)
             fig.suptitle('销售数据综合分析 (Comprehensive Sales Analysis)', 
                         fontsize=16, fontweight='bold', y=0.98)
             
             # 2.1 各地区销售额分布
-            region_sales.plot(kind='bar', ax=axes[0, 0], color='skyblue', alpha=0.8)
+            axes[0, 0].bar(region_names, region_sales.values, width=0.5, color='skyblue', alpha=0.8)
             axes[0, 0].set_title('各地区总销售额 (Total Sales by Region)', fontweight='bold')
             axes[0, 0].set_xlabel('地区 (Region)')
             axes[0, 0].set_ylabel('总销售额 (Total Sales)')
@@ -506,39 +930,24 @@ class MultiFileProcessor:
             if 'Product' in df.columns:
                 try:
                     # 检查Product列是否有效
-                    valid_products = df['Product'].notna()
-                    if valid_products.sum() > 0:
-                        # 清理Product列数据
-                        df_clean_products = df[valid_products].copy()
-                        
-                        # 确保Product列是字符串类型
-                        df_clean_products['Product'] = df_clean_products['Product'].astype(str)
-                        
-                        # 移除空字符串和"nan"字符串 - 修复布尔判断错误
-                        # 分步进行条件筛选以避免Series布尔判断错误
-                        mask1 = df_clean_products['Product'] != ''
-                        mask2 = df_clean_products['Product'] != 'nan'
-                        mask3 = df_clean_products['Product'] != 'None'
-                        
-                        # 组合所有条件
-                        combined_mask = mask1 & mask2 & mask3
-                        df_clean_products = df_clean_products[combined_mask]
+                    if df['Product'].notna().any():
+                        if top_products is None:
+                            # 清理Product列数据（无效产品名在类别层面去掉，不复制数据）
+                            products = self._valid_products(df['Product'])
+                            if products.notna().any():
+                                # 进行产品分组统计
+                                top_products = self._top_products(products, df['Sales'])[0]
                         
-                        if len(df_clean_products) > 0 and 'Sales' in df_clean_products.columns:
-                            # 重置索引以避免groupby问题
-                            df_clean_products = df_clean_products.reset_index(drop=True)
-                            
-                            # 进行产品分组统计
-                            product_sales = df_clean_products.groupby('Product', as_index=False)['Sales'].sum()
-                            product_sales = product_sales.sort_values('Sales', ascending=False).head(10)
+                        if top_products is not None:
+                            product_sales = top_products['总销售额']
                             
                             if len(product_sales) > 0:
                                 # 创建水平条形图
                                 y_pos = range(len(product_sales))
-                                axes[1, 0].barh(y_pos, product_sales['Sales'], 
+                                axes[1, 0].barh(y_pos, product_sales.to_numpy(), 
                                                color='lightgreen', alpha=0.8)
                                 axes[1, 0].set_yticks(y_pos)
-                                axes[1, 0].set_yticklabels(product_sales['Product'], fontsize=9)
+                                axes[1, 0].set_yticklabels(product_sales.index.astype(str), fontsize=9)
                                 axes[1, 0].set_title('销售额最高的前10个产品 (Top 10 Products by Sales)', fontweight='bold')
                                 axes[1, 0].set_xlabel('总销售额 (Total Sales)')
                                 axes[1, 0].grid(True, alpha=0.3, axis='x')
@@ -575,23 +984,22 @@ class MultiFileProcessor:
                                fontsize=12, bbox=dict(boxstyle="round,pad=0.3", facecolor="lightgray"))
                 axes[1, 0].set_title('产品销售分析 (Product Sales Analysis)', fontweight='bold')
             
-            # 2.4 订单数量vs销售额散点图
-            region_summary = df.groupby('Region').agg({'Sales': 'sum', 'Order_ID': 'count'})
-            scatter = axes[1, 1].scatter(region_summary['Order_ID'], region_summary['Sales'], 
+            # 2.4 订单数量vs销售额散点图（复用上面的地区统计）
+            scatter = axes[1, 1].scatter(region_stats['订单数'], region_stats['总销售额'], 
                                        s=120, alpha=0.7, color='orange', edgecolors='black')
-            for i, region in enumerate(region_summary.index):
-                axes[1, 1].annotate(region, 
-                                   (region_summary['Order_ID'].iloc[i], region_summary['Sales'].iloc[i]),
+            for i, region in enumerate(region_stats.index):
+                axes[1, 1].annotate(str(region), 
+                                   (region_stats['订单数'].iloc[i], region_stats['总销售额'].iloc[i]),
                                    xytext=(5, 5), textcoords='offset points', fontsize=9, fontweight='bold')
             axes[1, 1].set_title('订单数量 vs 总销售额 (Order Count vs Total Sales)', fontweight='bold')
             axes[1, 1].set_xlabel('订单数量 (Order Count)')
             axes[1, 1].set_ylabel('总销售额 (Total Sales)')
             axes[1, 1].grid(True, alpha=0.3)
             
-            plt.tight_layout()
             comprehensive_file = f"{output_dir}/comprehensive_analysis.png"
-            plt.savefig(comprehensive_file, dpi=300, bbox_inches='tight', facecolor='white')
-            plt.close()
+            with _ignore_missing_glyph_warnings():
+                fig.tight_layout()
+                fig.savefig(comprehensive_file, dpi=dpi, facecolor='white')
             generated_files.append(comprehensive_file)
             print(f"       ├─ 生成综合分析图: {comprehensive_file}")
             
@@ -622,47 +1030,43 @@ class MultiFileProcessor:
         
         print(f"开始生成分析报告，共 {len(sales_files)} 个销售数据文件")
         
-        # 创建报告内容
-        report_content = []
-        report_content.append("# 销售数据分析报告 (Sales Data Analysis Report)")
-        report_content.append(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report_content.append("")
-        report_content.append("## 数据概览 (Data Overview)")
-        
-        total_records = 0
-        total_sales = 0
-        all_regions = set()
-        all_products = set()
-        
-        for file_name, file_data in sales_files:
-            summary = file_data['summary']
-            total_records += summary['total_rows']
-            total_sales += summary.get('total_sales', 0)
-            
-            # 收集地区和产品信息
-            if 'region_analysis' in summary:
-                all_regions.update(summary['region_analysis'].keys())
-            if 'top_products' in summary:
-                all_products.update(summary['top_products'].keys())
-        
-        report_content.append(f"- 总记录数: {total_records:,}")
-        report_content.append(f"- 总销售额: {total_sales:,.2f}")
-        report_content.append(f"- 涉及地区: {len(all_regions)} 个")
-        report_content.append(f"- 涉及产品: {len(all_products)} 个")
-        report_content.append("")
+        # 金额格式化函数，全报告共用
+        money = '{:,.2f}'.format
+        
+        summaries = [file_data['summary'] for _, file_data in sales_files]
+        total_records = sum(summary['total_rows'] for summary in summaries)
+        total_sales = sum(summary.get('total_sales', 0) for summary in summaries)
+        
+        # 跨文件的地区、产品汇总
+        all_region_data, all_products = self._cross_file_stats()
+        
+        # 创建报告内容（按段落整块加入，最后逐行写出）
+        report_content = [
+            "# 销售数据分析报告 (Sales Data Analysis Report)",
+            f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            "",
+            "## 数据概览 (Data Overview)",
+            f"- 总记录数: {total_records:,}",
+            f"- 总销售额: {money(total_sales)}",
+            f"- 涉及地区: {len(all_region_data)} 个",
+            f"- 涉及产品: {len(all_products)} 个",
+            "",
+        ]
         
         # 详细分析每个文件
         for i, (file_name, file_data) in enumerate(sales_files, 1):
             summary = file_data['summary']
-            report_content.append(f"## 文件 {i}: {file_name}")
-            report_content.append("")
             
             # 基本信息
-            report_content.append("### 基本信息 (Basic Information)")
-            report_content.append(f"- 数据行数: {summary['total_rows']:,}")
-            report_content.append(f"- 数据列数: {summary['total_columns']}")
-            report_content.append(f"- 总销售额: {summary.get('total_sales', 0):,.2f}")
-            report_content.append(f"- 平均销售额: {summary.get('avg_sales', 0):,.2f}")
+            report_content.extend([
+                f"## 文件 {i}: {file_name}",
+                "",
+                "### 基本信息 (Basic Information)",
+                f"- 数据行数: {summary['total_rows']:,}",
+                f"- 数据列数: {summary['total_columns']}",
+                f"- 总销售额: {money(summary.get('total_sales', 0))}",
+                f"- 平均销售额: {money(summary.get('avg_sales', 0))}",
+            ])
             if 'date_range' in summary:
                 report_content.append(f"- 日期范围: {summary['date_range']['start']} ~ {summary['date_range']['end']}")
             report_content.append("")
@@ -670,114 +1074,187 @@ class MultiFileProcessor:
             # 地区分析
             if 'region_analysis' in summary:
                 report_content.append("### 地区分析 (Regional Analysis)")
-                region_data = summary['region_analysis']
-                for region, stats in region_data.items():
-                    report_content.append(f"- **{region}**: 总销售额 {stats['总销售额']:,.2f}, 订单数 {stats['订单数']}, 平均订单金额 {stats['平均订单金额']:,.2f}")
+                report_content.extend(
+                    f"- **{region}**: 总销售额 {money(stats['总销售额'])}, 订单数 {stats['订单数']}, 平均订单金额 {money(stats['平均订单金额'])}"
+                    for region, stats in summary['region_analysis'].items()
+                )
                 report_content.append("")
             
             # 产品分析
             if 'top_products' in summary:
                 report_content.append("### 热销产品 (Top Products)")
-                product_data = summary['top_products']
-                for product, stats in list(product_data.items())[:5]:  # 只显示前5个
-                    report_content.append(f"- **{product}**: 总销售额 {stats['总销售额']:,.2f}, 订单数 {stats['订单数']}")
+                report_content.extend(
+                    f"- **{product}**: 总销售额 {money(stats['总销售额'])}, 订单数 {stats['订单数']}"
+                    for product, stats in list(summary['top_products'].items())[:5]  # 只显示前5个
+                )
                 report_content.append("")
             
             # 可视化文件
             if 'visualization_files' in summary and summary['visualization_files']:
                 report_content.append("### 生成的图表 (Generated Charts)")
-                for chart_file in summary['visualization_files']:
-                    chart_name = os.path.basename(chart_file)
-                    report_content.append(f"- {chart_name}")
+                report_content.extend(f"- {os.path.basename(chart_file)}" for chart_file in summary['visualization_files'])
                 report_content.append("")
         
         # 业务见解
-        report_content.append("## 业务见解 (Business Insights)")
-        report_content.append("")
-        report_content.append("### 主要发现 (Key Findings)")
+        report_content.extend([
+            "## 业务见解 (Business Insights)",
+            "",
+            "### 主要发现 (Key Findings)",
+        ])
         
         # 地区分析见解
-        if sales_files:
-            all_region_data = {}
-            for file_name, file_data in sales_files:
-                if 'region_analysis' in file_data['summary']:
-                    for region, stats in file_data['summary']['region_analysis'].items():
-                        if region not in all_region_data:
-                            all_region_data[region] = {'总销售额': 0, '订单数': 0}
-                        all_region_data[region]['总销售额'] += stats['总销售额']
-                        all_region_data[region]['订单数'] += stats['订单数']
+        if not all_region_data.empty:
+            region_sales = all_region_data['总销售额']
+            region_orders = all_region_data['订单数']
             
-            if all_region_data:
-                # 找出最佳地区
-                best_region = max(all_region_data.items(), key=lambda x: x[1]['总销售额'])
-                report_content.append(f"1. **最佳销售地区**: {best_region[0]}，总销售额为 {best_region[1]['总销售额']:,.2f}")
-                
-                # 计算地区分布
-                total_region_sales = sum(data['总销售额'] for data in all_region_data.values())
-                best_region_percentage = (best_region[1]['总销售额'] / total_region_sales) * 100
-                report_content.append(f"   - 占总销售额的 {best_region_percentage:.1f}%")
-                
-                # 找出订单数最多的地区
-                most_orders_region = max(all_region_data.items(), key=lambda x: x[1]['订单数'])
-                if most_orders_region[0] != best_region[0]:
-                    report_content.append(f"2. **订单数最多地区**: {most_orders_region[0]}，共 {most_orders_region[1]['订单数']} 个订单")
-                
-                # 平均订单金额分析
-                avg_order_values = {region: data['总销售额'] / data['订单数'] 
-                                  for region, data in all_region_data.items() if data['订单数'] > 0}
-                if avg_order_values:
-                    best_avg_region = max(avg_order_values.items(), key=lambda x: x[1])
-                    report_content.append(f"3. **平均订单金额最高地区**: {best_avg_region[0]}，平均 {best_avg_region[1]:,.2f}")
-        
-        report_content.append("")
-        report_content.append("### 建议 (Recommendations)")
-        report_content.append("1. 加强在高销售额地区的市场投入，巩固市场地位")
-        report_content.append("2. 分析低销售额地区的原因，制定针对性的改进策略")
-        report_content.append("3. 研究高平均订单金额地区的成功因素，推广到其他地区")
-        report_content.append("4. 优化产品结构，重点推广热销产品")
-        report_content.append("")
-        
-        # 保存报告
+            # 找出最佳地区
+            best_region = region_sales.idxmax()
+            report_content.append(f"1. **最佳销售地区**: {best_region}，总销售额为 {money(region_sales[best_region])}")
+            
+            # 计算地区分布
+            best_region_percentage = (region_sales[best_region] / region_sales.sum()) * 100
+            report_content.append(f"   - 占总销售额的 {best_region_percentage:.1f}%")
+            
+            # 找出订单数最多的地区
+            most_orders_region = region_orders.idxmax()
+            if most_orders_region != best_region:
+                report_content.append(f"2. **订单数最多地区**: {most_orders_region}，共 {region_orders[most_orders_region]} 个订单")
+            
+            # 平均订单金额分析
+            has_orders = region_orders > 0
+            if has_orders.any():
+                avg_order_values = region_sales[has_orders] / region_orders[has_orders]
+                best_avg_region = avg_order_values.idxmax()
+                report_content.append(f"3. **平均订单金额最高地区**: {best_avg_region}，平均 {money(avg_order_values[best_avg_region])}")
+        
+        report_content.extend([
+            "",
+            "### 建议 (Recommendations)",
+            "1. 加强在高销售额地区的市场投入，巩固市场地位",
+            "2. 分析低销售额地区的原因，制定针对性的改进策略",
+            "3. 研究高平均订单金额地区的成功因素，推广到其他地区",
+            "4. 优化产品结构，重点推广热销产品",
+        ])
+        
+        # 保存报告（逐行写入带缓冲的文件，不再拼接出整份报告的中间字符串）
         report_file = f"{output_dir}/sales_analysis_report.md"
-        with open(report_file, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(report_content))
+        with open(report_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.writelines(f"{line}\n" for line in report_content)
         
         print(f"分析报告已保存到: {report_file}")
         return report_file
     
-    def process_multiple_files(self, file_paths, progress_callback=None):
-        """批量处理多个文件"""
+    def _cross_file_stats(self):
+        """各销售数据文件的地区、产品统计按键求和，返回 (地区汇总, 产品汇总)
+        摘要与上次完全相同（同一对象）时直接复用，连续生成多份报告时不重复汇总"""
+        summaries = [file_data.get('summary', {}) for file_data in self.processed_files.values()
+                     if file_data.get('success', True) and file_data.get('summary', {}).get('is_sales_data', False)]
+        
+        cached = self._cross_file_stats_cache
+        if (cached is not None and len(cached[0]) == len(summaries)
+                and all(a is b for a, b in zip(cached[0], summaries))):
+            return cached[1], cached[2]
+        
+        # 各文件的统计表拼接后一次 groupby 求和
+        all_regions = _sum_file_stats(summary.get('region_analysis') for summary in summaries)
+        all_products = _sum_file_stats(summary.get('top_products') for summary in summaries)
+        self._cross_file_stats_cache = (summaries, all_regions, all_products)
+        return all_regions, all_products
+    
+    def process_multiple_files(self, file_paths, progress_callback=None, max_workers=None):
+        """批量处理多个文件
+        
+        各文件相互独立，多于一个文件时用进程池并行处理（max_workers 默认为CPU核数）；
+        未指定 max_workers 且文件总大小不足 PARALLEL_MIN_BYTES 时，启动子进程的开销
+        超过并行收益，按顺序处理；max_workers=1 或进程池不可用时同样按顺序处理
+        
+        进程池使用平台默认的启动方式。Windows、macOS 等以 spawn 启动子进程的平台会在
+        子进程中重新导入调用方的主脚本，脚本中的调用必须放在 if __name__ == '__main__': 块内
+        """
         print(f"\n🚀 开始批量处理 {len(file_paths)} 个文件")
         
-        results = {}
         total_files = len(file_paths)
+        outcomes = {}
+        
+        workers = min(total_files, max_workers or os.cpu_count() or 1)
+        if max_workers is None and workers > 1:
+            total_bytes = sum(os.path.getsize(f) for f in file_paths if os.path.exists(f))
+            if total_bytes < PARALLEL_MIN_BYTES:
+                workers = 1
+        # 多进程处理时图表不在子进程中生成（各进程会同时写同一个图表文件），
+        # 统一在收集结果后由本进程按输入顺序生成
+        deferred_charts = workers > 1
+        if workers > 1:
+            print(f"⚙️ 使用 {workers} 个进程并行处理")
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = {executor.submit(_process_file_worker, file_path, self.cache_dir): file_path
+                               for file_path in file_paths}
+                    for done, future in enumerate(as_completed(futures), 1):
+                        file_path = futures[future]
+                        try:
+                            outcome = future.result()
+                        except BrokenProcessPool:
+                            raise
+                        except Exception as e:
+                            outcomes[file_path] = e
+                        else:
+                            if 'cache_file' in outcome:
+                                try:
+                                    # 子进程写好的 Parquet 缓存直接内存映射读取
+                                    table = pq.read_table(outcome.pop('cache_file'), memory_map=True)
+                                    outcome['processed_data'] = _cached_frame(table)
+                                except Exception as e:
+                                    # 缓存读取失败时不登记结果，由下面的顺序处理重新处理该文件
+                                    print(f"⚠️ 读取子进程结果失败，稍后重新处理 {Path(file_path).name}: {e}")
+                                    continue
+                            outcomes[file_path] = outcome
+                        if progress_callback:
+                            progress_callback(done, total_files, f"已完成 {done}/{total_files}: {Path(file_path).name}")
+            except (OSError, BrokenProcessPool) as e:
+                print(f"⚠️ 进程池不可用，改为顺序处理剩余文件: {e}")
+        
+        # 顺序处理（单文件、max_workers=1 或进程池失败后剩余的文件）
+        pending = [file_path for file_path in file_paths if file_path not in outcomes]
+        for file_path in pending:
+            i = file_paths.index(file_path) + 1
+            if progress_callback:
+                progress_callback(len(outcomes), total_files, f"正在处理文件 {i}/{total_files}: {Path(file_path).name}")
+            
+            print(f"\n📄 处理文件 {i}/{total_files}: {Path(file_path).name}")
+            try:
+                self.process_single_file(file_path, charts=not deferred_charts)
+                outcomes[file_path] = self.processed_files[Path(file_path).name]
+            except Exception as e:
+                outcomes[file_path] = e
         
+        # 按输入顺序汇总结果（processed_files 也按输入顺序登记，合并结果与顺序处理一致）
+        results = {}
         for i, file_path in enumerate(file_paths, 1):
-            try:
-                if progress_callback:
-                    progress_callback(i-1, total_files, f"正在处理文件 {i}/{total_files}: {Path(file_path).name}")
-                
-                print(f"\n📄 处理文件 {i}/{total_files}: {Path(file_path).name}")
-                
-                # 处理单个文件
-                df_processed, summary = self.process_single_file(file_path)
-                
+            outcome = outcomes[file_path]
+            if isinstance(outcome, Exception):
+                print(f"❌ 文件 {i} 处理失败: {str(outcome)}")
                 results[Path(file_path).name] = {
-                    'success': True,
-                    'data': df_processed,
-                    'summary': summary,
+                    'success': False,
+                    'error': str(outcome),
                     'file_path': file_path
                 }
-                
+            else:
                 print(f"✅ 文件 {i} 处理成功")
-                
-            except Exception as e:
-                print(f"❌ 文件 {i} 处理失败: {str(e)}")
+                self.processed_files[Path(file_path).name] = outcome
                 results[Path(file_path).name] = {
-                    'success': False,
-                    'error': str(e),
+                    'success': True,
+                    'data': outcome['processed_data'],
+                    'summary': outcome['summary'],
                     'file_path': file_path
                 }
+                
+                # 并行处理时图表在这里按输入顺序提交，图表文件与各摘要中的路径与顺序处理一致
+                if deferred_charts:
+                    self._submit_file_charts(Path(file_path).name)
+        
+        # 等待本进程提交的后台图表全部写出
+        self.wait_for_charts()
         
         if progress_callback:
             progress_callback(total_files, total_files, "所有文件处理完成")
@@ -785,6 +1262,120 @@ class MultiFileProcessor:
         print(f"\n✅ 批量处理完成，成功处理 {sum(1 for r in results.values() if r.get('success', False))}/{total_files} 个文件")
         return results
     
+    def process_all_lazy(self, directory_path="data"):
+        """用 Polars LazyFrame 汇总目录下所有CSV销售数据，不在内存中保留清洗后的明细
+        
+        每个文件按 basic_data_cleaning 的规则清洗（Price 中位数、Region 填充 REGION_FILL_VALUE、
+        去重、Quantity 按 IQR 上界截断、计算 Sales），按 generate_file_summary 的口径统计
+        各文件的地区与前 TOP_PRODUCT_COUNT 个产品（保留两位小数），再像 _cross_file_stats
+        一样跨文件求和；所有文件组成一个查询，由 Polars 并行读取并以流式引擎执行。
+        浮点求和顺序与 pandas 不同，个别金额可能相差 0.01
+        
+        返回与 generate_combined_report 对应的汇总：total_files、total_records、total_sales、
+        region_analysis（地区 -> {总销售额, 订单数}）、top_regions、top_products
+        """
+        if not HAS_POLARS:
+            raise ImportError("process_all_lazy 需要安装 polars")
+        
+        csv_files = [f for f in sorted(Path(directory_path).rglob("*.csv"))
+                     if CACHE_SUBDIR not in f.relative_to(directory_path).parts]
+        print(f"\n⚡ 开始惰性汇总目录: {directory_path}，共 {len(csv_files)} 个CSV文件")
+        
+        frames = []
+        file_names = []
+        for file_path in csv_files:
+            try:
+                frames.append(self._scan_sales_csv(file_path))
+                file_names.append(file_path.name)
+            except Exception as e:
+                print(f"  ⚠️ 跳过 {file_path.name}：{e}")
+        
+        if not frames:
+            print("没有可汇总的销售数据")
+            return None
+        
+        data = pl.concat(frames, how='vertical_relaxed')
+        sales = pl.col('Sales')
+        
+        # 只在 Polars 中按 (文件, 地区/产品) 分组求和，数据量随之缩小到每个文件几十行
+        region_lf = data.group_by('Source_File', 'Region').agg(
+            sales.sum().alias('总销售额'),
+            sales.count().alias('订单数'),
+        )
+        product_lf = data.filter(
+            pl.col('Product').is_not_null() & ~pl.col('Product').is_in(INVALID_PRODUCT_NAMES)
+        ).group_by('Source_File', 'Product').agg(
+            sales.sum().alias('总销售额'),
+            sales.count().alias('订单数'),
+        )
+        totals_lf = data.select(pl.len().alias('total_records'), sales.sum().alias('total_sales'))
+        
+        # 三个查询一起执行，共享文件读取与清洗部分
+        region_stats, product_stats, totals = _collect_streaming([region_lf, product_lf, totals_lf])
+        
+        # 与 generate_file_summary 相同：各文件统计保留两位小数，产品只保留前 TOP_PRODUCT_COUNT 个；
+        # 再按文件顺序交给 _sum_file_stats 跨文件求和，口径与 _cross_file_stats 一致
+        file_order = {name: i for i, name in enumerate(file_names)}
+        region_stats = region_stats.to_pandas()
+        product_stats = product_stats.to_pandas()
+        region_stats['总销售额'] = region_stats['总销售额'].round(2)
+        product_stats['总销售额'] = product_stats['总销售额'].round(2)
+        region_stats = region_stats.sort_values(['Source_File', 'Region'], key=lambda col: col.map(file_order)
+                                                if col.name == 'Source_File' else col)
+        product_stats = product_stats.sort_values(
+            ['Source_File', '总销售额', 'Product'], ascending=[True, False, True],
+            key=lambda col: col.map(file_order) if col.name == 'Source_File' else col,
+        ).groupby('Source_File', sort=False).head(TOP_PRODUCT_COUNT)
+        
+        all_regions = _sum_file_stats(
+            table.set_index('Region')[['总销售额', '订单数']].to_dict('index')
+            for _, table in region_stats.groupby('Source_File', sort=False))
+        all_products = _sum_file_stats(
+            table.set_index('Product')[['总销售额', '订单数']].to_dict('index')
+            for _, table in product_stats.groupby('Source_File', sort=False))
+        
+        summary = {
+            'total_files': len(frames),
+            'total_records': int(totals['total_records'][0]),
+            'total_sales': float(totals['total_sales'][0] or 0),
+            'region_analysis': all_regions.to_dict('index'),
+            'top_regions': all_regions['总销售额'].sort_values(ascending=False, kind='stable').head(10).to_dict(),
+            'top_products': all_products['总销售额'].sort_values(ascending=False, kind='stable').head(10).to_dict(),
+        }
+        
+        print(f"✅ 惰性汇总完成: {summary['total_files']} 个文件，{summary['total_records']} 条记录，"
+              f"总销售额 {summary['total_sales']:,.2f}")
+        return summary
+    
+    def _scan_sales_csv(self, file_path):
+        """惰性读取单个CSV，按 basic_data_cleaning 的销售数据规则清洗，
+        只保留汇总需要的 Source_File、Region、Product、Sales 列"""
+        lf = pl.scan_csv(file_path, encoding='utf8-lossy', infer_schema_length=10000)
+        names = lf.collect_schema().names()
+        lf = lf.rename({col: COLUMN_NAME_MAP.get(_normalize_column_name(col), col) for col in names})
+        if not _is_sales_data(lf.collect_schema().names()):
+            raise ValueError("不是销售数据")
+        
+        # 1/2. Price 用中位数、Region 用 REGION_FILL_VALUE 填充；3. 删除完全重复的行
+        lf = lf.with_columns(
+            pl.col('Price').cast(pl.Float64, strict=False),
+            pl.col('Quantity').cast(pl.Float64, strict=False),
+        ).with_columns(
+            pl.col('Price').fill_null(pl.col('Price').median()),
+            pl.col('Region').cast(pl.String).fill_null(REGION_FILL_VALUE),
+        ).unique(maintain_order=True)
+        
+        # 5/6. Quantity 按本文件的 IQR 上界截断后计算 Sales
+        quantity = pl.col('Quantity')
+        q1 = quantity.quantile(0.25, interpolation='linear')
+        q3 = quantity.quantile(0.75, interpolation='linear')
+        return lf.select(
+            pl.lit(file_path.name).alias('Source_File'),
+            pl.col('Region'),
+            pl.col('Product').cast(pl.String),
+            (quantity.clip(upper_bound=q3 + IQR_MULTIPLIER * (q3 - q1)) * pl.col('Price')).alias('Sales'),
+        )
+    
     def combine_all_data(self):
         """合并所有已处理的数据"""
         if not self.processed_files:
@@ -794,6 +1385,7 @@ class MultiFileProcessor:
         print(f"\n🔗 开始合并数据，共 {len(self.processed_files)} 个文件")
         
         combined_data_list = []
+        combined_names = []
         
         for file_name, file_data in self.processed_files.items():
             if file_data.get('success', True):  # 兼容不同的数据结构
@@ -807,31 +1399,14 @@ class MultiFileProcessor:
                     continue
                 
                 if df is not None and len(df) > 0:
-                    # 创建数据副本以避免修改原始数据
-                    df_copy = df.copy()
-                    
-                    # 重置索引以避免索引冲突
-                    df_copy = df_copy.reset_index(drop=True)
-                    
-                    # 确保列名唯一且一致
-                    if df_copy.columns.duplicated().any():
+                    # 确保列名唯一且一致（set_axis 只替换列标签，不复制数据）
+                    if df.columns.duplicated().any():
                         print(f"   ├─ 修复文件 {file_name} 的重复列名")
-                        # 为重复列名添加后缀
-                        cols = df_copy.columns.tolist()
-                        seen = set()
-                        for i, col in enumerate(cols):
-                            if col in seen:
-                                counter = 1
-                                new_col = f"{col}_{counter}"
-                                while new_col in seen:
-                                    counter += 1
-                                    new_col = f"{col}_{counter}"
-                                cols[i] = new_col
-                            seen.add(cols[i])
-                        df_copy.columns = cols
+                        df = df.set_axis(_dedup_column_names(df.columns), axis=1)
                     
-                    combined_data_list.append(df_copy)
-                    print(f"   ├─ 添加文件: {file_name} ({len(df_copy)} 行, {len(df_copy.columns)} 列)")
+                    combined_data_list.append(df)
+                    combined_names.append(file_name)
+                    print(f"   ├─ 添加文件: {file_name} ({len(df)} 行, {len(df.columns)} 列)")
                 else:
                     print(f"   ├─ 跳过空文件: {file_name}")
         
@@ -840,106 +1415,99 @@ class MultiFileProcessor:
             return None
         
         try:
-            # 检查所有DataFrame的列结构
-            all_columns = set()
-            for df in combined_data_list:
-                all_columns.update(df.columns)
-            
-            print(f"   ├─ 发现总共 {len(all_columns)} 个唯一列名")
-            
-            # 统一列结构 - 为每个DataFrame添加缺失的列
-            standardized_dfs = []
-            for i, df in enumerate(combined_data_list):
-                df_std = df.copy()
-                
-                # 添加缺失的列（用NaN填充）
-                missing_cols = all_columns - set(df.columns)
-                for col in missing_cols:
-                    df_std[col] = np.nan
-                
-                # 重新排序列以保持一致性
-                df_std = df_std.reindex(columns=sorted(all_columns))
-                standardized_dfs.append(df_std)
-            
-            # 合并数据
-            self.combined_data = pd.concat(standardized_dfs, ignore_index=True, sort=False)
+            target_cols = self._target_columns(combined_names, combined_data_list)
+            combined = self._concat_same_columns(combined_data_list, target_cols)
+            if combined is None and target_cols is not None:
+                combined = self._concat_float_frames(combined_data_list, target_cols)
+            if combined is None:
+                # 一次 concat 完成合并：外连接按列名对齐，文件缺少的列自动以缺失值填充；
+                # sort=True 在对齐时即按列名排序，结果直接按排序后的列写出，不再整表重排复制一次
+                combined = pd.concat(combined_data_list, join='outer', ignore_index=True, sort=True)
+            print(f"   ├─ 发现总共 {len(combined.columns)} 个唯一列名")
+            self.combined_data = combined
             print(f"✅ 数据合并完成，合并后总行数: {len(self.combined_data)}")
             print(f"   └─ 合并后列数: {len(self.combined_data.columns)}")
             
         except Exception as e:
             print(f"❌ 数据合并失败: {str(e)}")
-            print(f"   └─ 尝试使用备用合并方法...")
-            
-            try:
-                # 备用方法：只合并具有相同列结构的数据
-                grouped_by_columns = {}
-                for i, df in enumerate(combined_data_list):
-                    col_signature = tuple(sorted(df.columns))
-                    if col_signature not in grouped_by_columns:
-                        grouped_by_columns[col_signature] = []
-                    grouped_by_columns[col_signature].append(df)
-                
-                # 分别合并每组
-                merged_groups = []
-                for col_signature, df_group in grouped_by_columns.items():
-                    if len(df_group) > 1:
-                        group_merged = pd.concat(df_group, ignore_index=True)
-                        print(f"   ├─ 合并列结构组 {len(col_signature)} 列: {len(df_group)} 个文件")
-                    else:
-                        group_merged = df_group[0]
-                        print(f"   ├─ 单个文件组 {len(col_signature)} 列: 1 个文件")
-                    merged_groups.append(group_merged)
-                
-                # 最终合并所有组（使用outer join）
-                if len(merged_groups) == 1:
-                    self.combined_data = merged_groups[0]
-                else:
-                    # 使用外连接合并不同结构的数据
-                    self.combined_data = merged_groups[0]
-                    for df in merged_groups[1:]:
-                        # 找到共同列
-                        common_cols = list(set(self.combined_data.columns) & set(df.columns))
-                        if common_cols:
-                            print(f"   ├─ 基于 {len(common_cols)} 个共同列合并")
-                            # 只保留共同列进行合并
-                            df1_common = self.combined_data[common_cols].copy()
-                            df2_common = df[common_cols].copy()
-                            self.combined_data = pd.concat([df1_common, df2_common], ignore_index=True)
-                        else:
-                            print(f"   ├─ 无共同列，分别保存")
-                            # 如果没有共同列，添加所有列并用NaN填充
-                            all_cols = list(set(self.combined_data.columns) | set(df.columns))
-                            
-                            # 为第一个DataFrame添加缺失列
-                            for col in df.columns:
-                                if col not in self.combined_data.columns:
-                                    self.combined_data[col] = np.nan
-                            
-                            # 为第二个DataFrame添加缺失列
-                            df_extended = df.copy()
-                            for col in self.combined_data.columns:
-                                if col not in df_extended.columns:
-                                    df_extended[col] = np.nan
-                            
-                            # 重新排序列
-                            self.combined_data = self.combined_data.reindex(columns=all_cols)
-                            df_extended = df_extended.reindex(columns=all_cols)
-                            
-                            # 合并
-                            self.combined_data = pd.concat([self.combined_data, df_extended], ignore_index=True)
-                
-                print(f"✅ 备用方法合并成功，合并后总行数: {len(self.combined_data)}")
-                print(f"   └─ 合并后列数: {len(self.combined_data.columns)}")
-                
-            except Exception as backup_error:
-                print(f"❌ 备用合并方法也失败: {str(backup_error)}")
-                print(f"   └─ 返回空结果")
-                return None
+            raise
         
         return self.combined_data
     
-    def save_results(self, output_dir="outputs", separate_files=True, combined_file=True):
-        """保存处理结果"""
+    def _target_columns(self, file_names, frames):
+        """合并结果的目标列：各文件列名的并集按名称排序后的 pd.Index
+        
+        以参与合并的文件名集合为键缓存在实例上，各文件列未变时直接复用，不再重复求并集和排序；
+        列名类型混杂无法排序时返回 None
+        """
+        key = frozenset(file_names)
+        cached = self._column_index_cache.get(key)
+        if cached is not None:
+            file_columns, target_cols = cached
+            if all(df.columns.equals(file_columns[name]) for name, df in zip(file_names, frames)):
+                return target_cols
+        
+        all_columns = pd.Index(list(dict.fromkeys(col for df in frames for col in df.columns)))
+        try:
+            target_cols = all_columns.sort_values()
+        except TypeError:
+            target_cols = None
+        self._column_index_cache[key] = (
+            {name: df.columns for name, df in zip(file_names, frames)}, target_cols)
+        return target_cols
+    
+    def _concat_float_frames(self, frames, columns):
+        """按列分流的合并：在所有出现它的文件中都是 float64 的列（Price、Sales 等）
+        预分配以 NaN 填充的数组，按行区间整列写入，不经 concat 的逐块对齐；
+        其余列（类别、日期、整数等）仍由 concat 外连接合并，结果与 concat(sort=True) 一致
+        
+        columns 为 _target_columns 给出的排序后全部列名；没有这样的 float64 列时返回 None
+        """
+        float_columns = [col for col in columns
+                         if all(df[col].dtype == np.float64 for df in frames if col in df.columns)]
+        if not float_columns:
+            return None
+        
+        lengths = [len(df) for df in frames]
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        float_data = {}
+        for col in float_columns:
+            out = np.full(offsets[-1], np.nan, dtype=np.float64)
+            for df, start, stop in zip(frames, offsets[:-1], offsets[1:]):
+                if col in df.columns:
+                    out[start:stop] = df[col].to_numpy(dtype=np.float64)
+            float_data[col] = out
+        
+        float_set = set(float_columns)
+        other_frames = [df[[col for col in df.columns if col not in float_set]] for df in frames]
+        # 不含其他列的文件仍保留行数（concat 按索引拼接），缺失值由外连接补齐
+        combined = pd.concat(other_frames, join='outer', ignore_index=True, sort=True)
+        combined = pd.concat([combined, pd.DataFrame(float_data, index=combined.index)], axis=1)
+        return combined[columns]
+    
+    def _concat_same_columns(self, frames, sorted_columns):
+        """各文件列完全一致（同一模板导出）时的合并快速路径：不做列对齐直接按块拼接，
+        最后按 sorted_columns 排序一次；列不一致时返回 None"""
+        columns = frames[0].columns
+        if not all(df.columns.equals(columns) for df in frames[1:]):
+            return None
+        
+        print(f"   ├─ 各文件列结构相同，直接拼接")
+        combined = pd.concat(frames, ignore_index=True, sort=False)
+        if sorted_columns is None:
+            # 列名类型混杂无法排序时保持原顺序（与 concat(sort=True) 一致）
+            return combined
+        if not sorted_columns.equals(columns):
+            combined = combined[sorted_columns]
+        return combined
+    
+    def save_results(self, output_dir="outputs", separate_files=True, combined_file=True,
+                     combined_parquet=True, combined_csv=False, downcast=True):
+        """
+        保存处理结果
+        合并文件默认以 Parquet（snappy 压缩）保存，combined_csv=True 时另存一份CSV；
+        downcast=True 时整数列在写出前降为最小的整数类型
+        """
         import os
         from datetime import datetime
         
@@ -950,8 +1518,15 @@ class MultiFileProcessor:
         print(f"保存设置: 单独文件={separate_files}, 合并文件={combined_file}")
         
         saved_files = []
+        saved_sizes = {}  # 文件路径 -> 大小（KB），每个文件只 stat 一次
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
+        def record_saved(path):
+            """记录已保存的文件并返回其大小（KB）"""
+            saved_files.append(path)
+            saved_sizes[path] = os.stat(path).st_size / 1024
+            return saved_sizes[path]
+        
         # 保存单独的处理文件
         if separate_files and self.processed_files:
             print(f"   ├─ 保存单独处理文件...")
@@ -967,26 +1542,46 @@ class MultiFileProcessor:
                         continue
                     
                     if df is not None and len(df) > 0:
+                        if downcast:
+                            df = _downcast_integers(df)
+                        
                         # 生成输出文件名
                         base_name = Path(file_name).stem
                         output_file = f"{output_dir}/{base_name}_processed_{timestamp}.csv"
                         
                         # 保存文件
-                        df.to_csv(output_file, index=False, encoding='utf-8-sig')
-                        saved_files.append(output_file)
-                        
-                        file_size = os.path.getsize(output_file) / 1024  # KB
+                        write_csv(df, output_file)
+                        file_size = record_saved(output_file)
                         print(f"      ├─ 保存文件: {output_file} ({file_size:.1f} KB)")
         
         # 保存合并文件
         if combined_file and self.combined_data is not None:
             print(f"   ├─ 保存合并文件...")
-            combined_output_file = f"{output_dir}/combined_data_{timestamp}.csv"
-            self.combined_data.to_csv(combined_output_file, index=False, encoding='utf-8-sig')
-            saved_files.append(combined_output_file)
+            combined_outputs = []
+            combined = _downcast_integers(self.combined_data) if downcast else self.combined_data
             
-            file_size = os.path.getsize(combined_output_file) / 1024  # KB
-            print(f"      ├─ 保存合并文件: {combined_output_file} ({file_size:.1f} KB)")
+            # 列式存储 + 压缩，重复的地区/产品字符串按字典编码，体积和读写耗时远小于CSV
+            if combined_parquet and HAS_PYARROW:
+                parquet_file = f"{output_dir}/combined_data_{timestamp}.parquet"
+                try:
+                    combined.to_parquet(parquet_file, engine='pyarrow',
+                                        compression='snappy', index=False)
+                    combined_outputs.append(parquet_file)
+                except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+                    # 混合类型的 object 列等无法转换为 Arrow，改存CSV
+                    print(f"      ├─ 合并数据无法保存为Parquet，改存CSV: {str(e)}")
+                    combined_csv = True
+            else:
+                combined_csv = True
+            
+            if combined_csv:
+                csv_file = f"{output_dir}/combined_data_{timestamp}.csv"
+                write_csv(combined, csv_file)
+                combined_outputs.append(csv_file)
+            
+            for combined_output_file in combined_outputs:
+                file_size = record_saved(combined_output_file)
+                print(f"      ├─ 保存合并文件: {combined_output_file} ({file_size:.1f} KB)")
         
         # 保存处理摘要
         if self.processed_files:
@@ -1008,10 +1603,8 @@ class MultiFileProcessor:
             if summary_data:
                 summary_df = pd.DataFrame(summary_data)
                 summary_file = f"{output_dir}/processing_summary_{timestamp}.csv"
-                summary_df.to_csv(summary_file, index=False, encoding='utf-8-sig')
-                saved_files.append(summary_file)
-                
-                file_size = os.path.getsize(summary_file) / 1024  # KB
+                write_csv(summary_df, summary_file)
+                file_size = record_saved(summary_file)
                 print(f"      ├─ 保存摘要文件: {summary_file} ({file_size:.1f} KB)")
         
         # 生成分析报告（如果有销售数据）
@@ -1026,8 +1619,7 @@ class MultiFileProcessor:
             try:
                 report_file = self.generate_analysis_report(output_dir)
                 if report_file:
-                    saved_files.append(report_file)
-                    file_size = os.path.getsize(report_file) / 1024  # KB
+                    file_size = record_saved(report_file)
                     print(f"      ├─ 保存分析报告: {report_file} ({file_size:.1f} KB)")
             except Exception as e:
                 print(f"      ├─ 生成分析报告时出错: {str(e)}")
@@ -1035,7 +1627,7 @@ class MultiFileProcessor:
         print(f"✅ 结果保存完成，共保存 {len(saved_files)} 个文件")
         
         # 显示保存结果摘要
-        total_size = sum(os.path.getsize(f) / 1024 for f in saved_files if os.path.exists(f))
+        total_size = sum(saved_sizes.values())
         print(f"   └─ 文件总大小: {total_size:.1f} KB")
         
         return saved_files
@@ -1051,9 +1643,6 @@ class MultiFileProcessor:
         total_records = 0
         total_sales = 0
         
-        # 收集地区和产品信息
-        all_regions = {}
-        all_products = {}
         file_breakdown = {}
         
         for file_name, file_data in self.processed_files.items():
@@ -1072,34 +1661,26 @@ class MultiFileProcessor:
                     '销售额': sales,
                     '是否销售数据': summary.get('is_sales_data', False)
                 }
-                
-                # 地区统计
-                if 'region_analysis' in summary:
-                    for region, stats in summary['region_analysis'].items():
-                        if region not in all_regions:
-                            all_regions[region] = 0
-                        all_regions[region] += stats.get('总销售额', 0)
-                
-                # 产品统计
-                if 'top_products' in summary:
-                    for product, stats in summary['top_products'].items():
-                        if product not in all_products:
-                            all_products[product] = 0
-                        all_products[product] += stats.get('总销售额', 0)
         
-        # 排序
-        top_regions = dict(sorted(all_regions.items(), key=lambda x: x[1], reverse=True)[:10])
-        top_products = dict(sorted(all_products.items(), key=lambda x: x[1], reverse=True)[:10])
+        # 跨文件汇总后按销售额排序（稳定排序，销售额相同时保持首次出现的顺序）
+        all_regions, all_products = self._cross_file_stats()
+        top_regions = all_regions['总销售额'].sort_values(ascending=False, kind='stable').head(10).to_dict()
+        top_products = all_products['总销售额'].sort_values(ascending=False, kind='stable').head(10).to_dict()
         
         # 日期范围
         date_range = None
         if self.combined_data is not None and 'Order_Date' in self.combined_data.columns:
             try:
-                dates = pd.to_datetime(self.combined_data['Order_Date'], errors='coerce').dropna()
-                if len(dates) > 0:
+                dates = self.combined_data['Order_Date']
+                if not pd.api.types.is_datetime64_any_dtype(dates):
+                    # 只需极值：字符串日期先去重，只解析各不相同的值
+                    dates = dates.drop_duplicates()
+                dates = _parse_dates(dates)
+                start, end = dates.min(), dates.max()
+                if pd.notna(start):
                     date_range = {
-                        'start': dates.min().strftime('%Y-%m-%d'),
-                        'end': dates.max().strftime('%Y-%m-%d')
+                        'start': start.strftime('%Y-%m-%d'),
+                        'end': end.strftime('%Y-%m-%d')
                     }
             except:
                 pass
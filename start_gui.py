@@ -9,6 +9,8 @@
 import subprocess
 import sys
 import os
+import importlib.util
+from importlib.metadata import distribution, PackageNotFoundError
 from pathlib import Path
 
 def check_dependencies():
@@ -24,10 +26,13 @@ def check_dependencies():
     missing_packages = []
     
     for package in required_packages:
+        # 只读取安装元数据，不真正导入（导入 streamlit/pandas 等需要数秒和大量内存）
         try:
-            __import__(package)
-        except ImportError:
-            missing_packages.append(package)
+            distribution(package)
+        except PackageNotFoundError:
+            # 没有元数据时（如直接放在 sys.path 上的源码目录）按模块能否被找到判断
+            if importlib.util.find_spec(package) is None:
+                missing_packages.append(package)
     
     return missing_packages
 